@@ -0,0 +1,324 @@
+"""Asynchronous I/O - Adaptive concurrency limiter (AIMD, gradient).
+
+A fixed `asyncio.Semaphore(n)` is either too small (backend idle) or too large:
+when the backend slows down, `n` requests pile up in it, and latency and errors
+go up for everyone.
+
+`AdaptiveLimiter` is a semaphore whose limit follows observed latency and errors:
+
+- `AIMD`: additive increase (+1 per round trip) while healthy, multiplicative
+  decrease (e.g. x0.9) on errors or latency above `timeout`
+  (like TCP congestion control).
+- `Gradient`: compare latency with the no-load (minimum) latency,
+  `limit = limit * min_rtt / rtt + sqrt(limit)`: the limit shrinks as soon as
+  requests queue up in the backend, before errors happen.
+
+The limit is updated once per window (about one round trip), and increased only
+when it is actually used (`inflight * 2 >= limit`), so an idle period does not
+grow it without bound.
+
+Run: `python -m examples.core.asyncio_adaptive_limiter`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from types import TracebackType
+from typing import Any, Protocol, Self
+
+logging.basicConfig(
+    level=logging.DEBUG, style='{', format='[{threadName} ({thread})] {message}'
+)
+
+
+class LimitAlgorithm(Protocol):
+    def update(self, limit: float, rtt: float, inflight: int, dropped: bool) -> float:
+        """New limit, from a window of samples.
+
+        :param `rtt`: mean latency, in seconds
+        :param `inflight`: max in-flight requests
+        :param `dropped`: any error
+        """
+
+
+class AIMD:
+    """Additive increase (+1 per window, i.e. per round trip),
+    multiplicative decrease."""
+
+    def __init__(self, timeout: float = 1.0, backoff_ratio: float = 0.9) -> None:
+        self.timeout = timeout  # latency above it counts as a drop
+        self.backoff_ratio = backoff_ratio
+
+    def update(self, limit: float, rtt: float, inflight: int, dropped: bool) -> float:
+        if dropped or rtt > self.timeout:
+            return limit * self.backoff_ratio
+        if inflight * 2 >= limit:
+            return limit + 1
+        return limit
+
+
+class Gradient:
+    """Latency gradient, like Netflix `GradientLimit`.
+
+    `min_rtt` (no-load latency) is the minimum latency, drifting up slowly
+    (`drift` per window) to follow a change of the baseline.
+
+    :param `tolerance`: latency up to `tolerance * min_rtt` is still healthy
+    :param `smoothing`: weight of the new limit
+    """
+
+    def __init__(
+        self, tolerance: float = 1.5, smoothing: float = 0.2, drift: float = 0.001
+    ) -> None:
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.drift = drift
+        self.min_rtt = math.inf
+
+    def update(self, limit: float, rtt: float, inflight: int, dropped: bool) -> float:
+        self.min_rtt = min(self.min_rtt * (1 + self.drift), rtt)
+        if dropped:
+            gradient = 0.5
+        elif inflight * 2 < limit:  # not using the limit, no evidence
+            return limit
+        else:
+            gradient = max(0.5, min(1.0, self.tolerance * self.min_rtt / rtt))
+        new_limit = limit * gradient + math.sqrt(limit)  # queue size: sqrt(limit)
+        return limit * (1 - self.smoothing) + new_limit * self.smoothing
+
+
+class AdaptiveLimiter:  # pylint: disable=too-many-instance-attributes
+    """`async with limiter:`, at most `limit` at a time, adjusted by `algorithm`.
+
+    Like `asyncio.Semaphore`: FIFO waiters, a released slot is handed over to the
+    first waiter. Errors (exceptions of `errors` types) inside `async with` count
+    as drops, other exceptions (e.g. cancellation) are not sampled.
+
+    The limit is updated once per window of `max(min_window, limit)` samples,
+    about one round trip: a sample reflects the limit at its start, updating on
+    every sample overreacts to stale feedback and oscillates.
+    """
+
+    def __init__(
+        self,
+        algorithm: LimitAlgorithm | None = None,
+        *,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 1000,
+        min_window: int = 10,
+        errors: tuple[type[BaseException], ...] = (TimeoutError, ConnectionError),
+    ) -> None:
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError('1 <= min_limit <= initial_limit <= max_limit required')
+        self.algorithm: LimitAlgorithm = algorithm or Gradient()
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.min_window = min_window
+        self.errors = errors
+        self._limit = float(initial_limit)
+        self._inflight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        # `async with` tokens of each task
+        self._tokens: dict[asyncio.Task[Any] | None, list[tuple[float, int]]] = {}
+        self.drops = 0
+        # current window
+        self._samples = 0
+        self._rtt_sum = 0.0
+        self._max_inflight = 0
+        self._dropped = False
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__} limit={self.limit} inflight={self._inflight} '
+            f'waiters={len(self._waiters)}>'
+        )
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def locked(self) -> bool:
+        return self._inflight >= int(self._limit)
+
+    async def acquire(self) -> tuple[float, int]:
+        """Wait for a slot, return the token to pass to `release()`."""
+        loop = asyncio.get_running_loop()
+        if self._inflight < int(self._limit) and not self._waiters:
+            self._inflight += 1
+        else:
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # slot handed over, then cancelled: pass it on
+                    self._inflight -= 1
+                    self._wake_up()
+                raise
+        return loop.time(), self._inflight
+
+    def release(
+        self, token: tuple[float, int], *, dropped: bool = False, sample: bool = True
+    ) -> None:
+        started_at, inflight = token
+        self._inflight -= 1
+        if sample:
+            if dropped:
+                self.drops += 1
+                self._dropped = True
+            self._samples += 1
+            self._rtt_sum += asyncio.get_running_loop().time() - started_at
+            self._max_inflight = max(self._max_inflight, inflight)
+            if self._samples >= max(self.min_window, self._limit):
+                self._update()
+        self._wake_up()
+
+    def _update(self) -> None:
+        limit = self.algorithm.update(
+            self._limit,
+            self._rtt_sum / self._samples,
+            self._max_inflight,
+            self._dropped,
+        )
+        self._limit = min(self.max_limit, max(self.min_limit, limit))
+        self._samples = 0
+        self._rtt_sum = 0.0
+        self._max_inflight = 0
+        self._dropped = False
+
+    def _wake_up(self) -> None:
+        while self._waiters and self._inflight < int(self._limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():  # skip cancelled
+                self._inflight += 1
+                waiter.set_result(None)
+
+    async def __aenter__(self) -> Self:
+        token = await self.acquire()
+        self._tokens.setdefault(asyncio.current_task(), []).append(token)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        task = asyncio.current_task()
+        tokens = self._tokens[task]
+        token = tokens.pop()
+        if not tokens:
+            del self._tokens[task]
+        dropped = exc_type is not None and issubclass(exc_type, self.errors)
+        self.release(token, dropped=dropped, sample=exc_type is None or dropped)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            'limit': self.limit,
+            'inflight': self._inflight,
+            'waiters': len(self._waiters),
+            'drops': self.drops,
+        }
+
+
+class Backend:
+    """Simulated backend: `capacity` requests at a time take `service_time`,
+    more queue up (latency grows linearly), and time out after `timeout`."""
+
+    def __init__(
+        self, capacity: int, service_time: float = 0.01, timeout: float = 0.1
+    ) -> None:
+        self.capacity = capacity
+        self.service_time = service_time
+        self.timeout = timeout
+        self.inflight = 0
+
+    async def call(self) -> None:
+        self.inflight += 1
+        try:
+            latency = self.service_time * max(1.0, self.inflight / self.capacity)
+            if latency > self.timeout:
+                await asyncio.sleep(self.timeout)
+                raise TimeoutError('backend overloaded')
+            await asyncio.sleep(latency)
+        finally:
+            self.inflight -= 1
+
+
+async def bench(name: str, limiter: AdaptiveLimiter | asyncio.Semaphore) -> None:
+    """200 clients; backend capacity 20, down to 5 (slowdown), then up to 40.
+
+    Latency is measured inside the limiter, i.e. as seen by the backend.
+    """
+    backend = Backend(capacity=20)
+    ok = errors = 0
+    latencies: list[float] = []
+    limits: list[int] = []
+    stop = False
+
+    async def client() -> None:
+        nonlocal ok, errors
+        while not stop:
+            try:
+                async with limiter:
+                    t0 = time.perf_counter()
+                    await backend.call()
+                    latencies.append(time.perf_counter() - t0)
+            except TimeoutError:
+                errors += 1
+            else:
+                ok += 1
+
+    clients = [asyncio.create_task(client()) for _ in range(200)]
+    for capacity in (20, 5, 40):
+        backend.capacity = capacity
+        phase: list[int] = []
+        for _ in range(10):
+            await asyncio.sleep(0.1)
+            phase.append(limiter.limit if isinstance(limiter, AdaptiveLimiter) else 0)
+        limits.append(round(sum(phase) / len(phase)))
+    stop = True
+    await asyncio.gather(*clients)
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else math.nan
+    adaptive = isinstance(limiter, AdaptiveLimiter)
+    by_phase = f', limit by phase {limits}' if adaptive else ''
+    logging.info(
+        f'{name:>16}: {ok / 3:>6,.0f} ok/s, {errors / 3:>6,.0f} errors/s, '
+        f'p99 {p99 * 1000:>5.0f} ms{by_phase}'
+    )
+
+
+async def main() -> None:
+    limiter = AdaptiveLimiter(AIMD(), initial_limit=2, max_limit=4, min_window=1)
+    for _ in range(2):  # window: 2 samples
+        async with limiter:
+            assert limiter.inflight == 1
+    assert limiter.limit == 3  # +1: 1 in flight of 2, healthy
+    for _ in range(3):  # window: 3 samples
+        try:
+            async with limiter:
+                raise ConnectionError
+        except ConnectionError:
+            pass
+    assert limiter.drops == 3 and limiter.limit == 2  # 3 * 0.9
+
+    await bench('Semaphore(200)', asyncio.Semaphore(200))
+    await bench('Semaphore(20)', asyncio.Semaphore(20))
+    await bench('AIMD', AdaptiveLimiter(AIMD(timeout=0.025), initial_limit=10))
+    await bench('Gradient', AdaptiveLimiter(Gradient(), initial_limit=10))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
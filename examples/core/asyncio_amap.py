@@ -0,0 +1,200 @@
+"""Asynchronous I/O - Bounded-concurrency streaming map.
+
+`asyncio.wait()`, `asyncio.as_completed()` and `asyncio.gather()` take all
+awaitables up front: for millions of inputs, every task (and coroutine) is
+allocated at once.
+
+`amap(func, iterable, concurrency=N, ordered=...)` pulls inputs lazily,
+keeps at most `N` tasks in flight, and yields results:
+
+- as they complete (`ordered=False`), or
+- in input order (`ordered=True`): a completed result waits for earlier ones,
+  the reorder buffer is bounded by `N` too (no new input is pulled
+  `N` positions past the oldest result not yet yielded).
+
+Closing or cancelling the consumer cancels all in-flight tasks.
+
+Run: `python -m examples.core.asyncio_amap`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+import tracemalloc
+from collections import deque
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+)
+from typing import TypeVar
+
+logging.basicConfig(
+    level=logging.DEBUG, style='{', format='[{threadName} ({thread})] {message}'
+)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+async def amap(
+    func: Callable[[T], Awaitable[R]],
+    iterable: AsyncIterable[T] | Iterable[T],
+    *,
+    concurrency: int = 16,
+    ordered: bool = False,
+) -> AsyncGenerator[R]:
+    """Yield `await func(item)` of each item, at most `concurrency` at a time.
+
+    The first exception raised by `func` is propagated, after cancelling
+    the other tasks. Use `contextlib.aclosing()` to clean up at once when
+    breaking out of `async for`.
+    """
+    if concurrency < 1:
+        raise ValueError('concurrency must be >= 1')
+
+    is_async = isinstance(iterable, AsyncIterable)
+    items = aiter(iterable) if is_async else iter(iterable)  # type: ignore[arg-type]
+    exhausted = False
+
+    async def pull() -> tuple[bool, T | None]:
+        nonlocal exhausted
+        try:
+            if is_async:
+                return True, await anext(items)  # type: ignore[arg-type]
+            return True, next(items)  # type: ignore[arg-type]
+        except (StopIteration, StopAsyncIteration):
+            exhausted = True
+            return False, None
+
+    # Completed tasks, in completion order: O(1) per completion,
+    # instead of `asyncio.wait(FIRST_COMPLETED)` over all pending tasks.
+    completed: deque[asyncio.Task[R]] = deque()
+    waiter: asyncio.Future[None] | None = None
+
+    def on_done(task: asyncio.Task[R]) -> None:
+        completed.append(task)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    # in input order if `ordered`
+    tasks: deque[asyncio.Task[R]] | set[asyncio.Task[R]] = deque() if ordered else set()
+
+    async def fill() -> None:
+        while not exhausted and len(tasks) < concurrency:
+            ok, item = await pull()
+            if ok:
+                task = asyncio.ensure_future(func(item))  # type: ignore[arg-type]
+                if isinstance(tasks, deque):
+                    tasks.append(task)
+                else:
+                    tasks.add(task)
+                    task.add_done_callback(on_done)
+
+    loop = asyncio.get_running_loop()
+    try:
+        await fill()
+        while tasks:
+            if isinstance(tasks, deque):
+                # the head stays in `tasks` while awaited, to be cancelled
+                result = await tasks[0]  # pylint: disable=unsubscriptable-object
+                tasks.popleft()
+            else:
+                while not completed:
+                    waiter = loop.create_future()
+                    await waiter
+                    waiter = None
+                task = completed.popleft()
+                tasks.discard(task)
+                result = task.result()  # raise the error
+            await fill()
+            yield result
+    finally:
+        await _cancel(tasks)
+
+
+async def _cancel(tasks: Iterable[asyncio.Task[R]]) -> None:
+    tasks = list(tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def arange(n: int) -> AsyncIterator[int]:
+    for i in range(n):
+        yield i
+
+
+async def do_task(i: int) -> int:
+    await asyncio.sleep(0.001 * (i % 7))
+    return i
+
+
+async def main() -> None:
+    # ordered
+    results = [r async for r in amap(do_task, range(100), concurrency=10, ordered=True)]
+    assert results == list(range(100))
+
+    # as completed, from an async iterable
+    results = [r async for r in amap(do_task, arange(100), concurrency=10)]
+    assert sorted(results) == list(range(100)) and results != list(range(100))
+
+    # closing the consumer cancels in-flight tasks
+    started: list[int] = []
+
+    async def slow(i: int) -> int:
+        started.append(i)
+        await asyncio.sleep(10)
+        return i
+
+    async with contextlib.aclosing(amap(slow, range(100), concurrency=5)) as it:
+        with contextlib.suppress(TimeoutError):
+            async with asyncio.timeout(0.1):
+                await anext(it)
+    assert len(started) == 5
+    assert not [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+    # memory: 200,000 inputs
+    n = 200_000
+
+    async def noop(i: int) -> int:
+        await asyncio.sleep(0)
+        return i
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    count = 0
+    for coro in asyncio.as_completed([noop(i) for i in range(n)]):
+        await coro
+        count += 1
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    logging.info(
+        f'as_completed(): {elapsed:.2f} seconds, peak {peak / 1024 / 1024:.1f} MiB'
+    )
+
+    for ordered in (False, True):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        count = 0
+        async for _ in amap(noop, range(n), concurrency=100, ordered=ordered):
+            count += 1
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert count == n
+        logging.info(
+            f'amap(ordered={ordered}): {elapsed:.2f} seconds, '
+            f'peak {peak / 1024 / 1024:.1f} MiB'
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,142 @@
+"""Asynchronous I/O - Micro-batching Queue.
+
+Consumers take items in batches, `await queue.get_batch(max_items, max_wait)`,
+so a downstream round trip (Redis, MongoDB, ...) is paid once per batch,
+not once per item.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, NoReturn, TypeVar
+
+logging.basicConfig(
+    level=logging.DEBUG, style='{', format='[{threadName} ({thread})] {message}'
+)
+
+T = TypeVar('T')
+
+
+class BatchQueue(asyncio.Queue[T]):
+    def __init__(self, maxsize: int = 0) -> None:
+        super().__init__(maxsize)
+        self.overshoot = 0  # max items over `maxsize`, by requeued batches
+
+    async def get_batch(self, max_items: int, max_wait: float) -> list[T]:
+        """Remove and return a batch of up to `max_items` items.
+
+        Wait for the first item, then return as soon as `max_items` items are
+        taken, or `max_wait` seconds have passed since the first one.
+
+        Call `task_done(len(batch))` when the batch has been processed.
+        """
+        assert max_items > 0
+        items: list[T] = [await self.get()]
+        deadline = asyncio.get_running_loop().time() + max_wait
+        try:
+            while len(items) < max_items:
+                if not self.empty():
+                    items.append(self.get_nowait())
+                    continue
+                async with asyncio.timeout_at(deadline):  # Python 3.11+
+                    items.append(await self.get())
+        except TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Put taken items back to the head, they are still unfinished.
+            # Producers may have filled the freed slots meanwhile: the queue goes
+            # over `maxsize` (by up to `len(items)`), until it drains below it
+            # `full()` is true, `put()` waits and `put_nowait()` raises `QueueFull`.
+            self._queue.extendleft(reversed(items))  # type: ignore[attr-defined]
+            if self.maxsize > 0:
+                self.overshoot = max(self.overshoot, self.qsize() - self.maxsize)
+            self._wakeup_next(self._getters)  # type: ignore[attr-defined]
+            raise
+        return items
+
+    def task_done(self, n: int = 1) -> None:
+        """Indicate that `n` formerly enqueued items are complete."""
+        for _ in range(n):
+            super().task_done()
+
+
+async def worker(
+    i: int, queue: BatchQueue[float], max_items: int, max_wait: float
+) -> NoReturn:
+    while True:
+        # Get a batch of "work items" out of the queue.
+        batch = await queue.get_batch(max_items, max_wait)
+
+        # One round trip per batch.
+        await asyncio.sleep(max(batch))
+
+        # Notify the queue that the batch has been processed.
+        queue.task_done(len(batch))
+
+        logging.debug(f'worker {i} has processed {len(batch)} items')
+
+
+async def bench(
+    items: int, workers: int, max_items: int, max_wait: float, round_trip: float
+) -> float:
+    """Return items/s."""
+    queue: BatchQueue[float] = BatchQueue()
+
+    tasks = [
+        asyncio.create_task(worker(i, queue, max_items, max_wait))
+        for i in range(workers)
+    ]
+
+    started_at = time.monotonic()
+    for _ in range(items):
+        queue.put_nowait(round_trip)
+    await queue.join()
+    elapsed = time.monotonic() - started_at
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return items / elapsed
+
+
+async def requeue() -> None:
+    """A cancelled consumer puts its items back, over `maxsize` if refilled."""
+    queue: BatchQueue[int] = BatchQueue(2)
+    queue.put_nowait(1)
+    queue.put_nowait(2)
+    consumer = asyncio.create_task(queue.get_batch(max_items=10, max_wait=1.0))
+    await asyncio.sleep(0.01)  # 2 items taken, waiting for more
+    queue.put_nowait(3)
+    queue.put_nowait(4)  # freed slots refilled
+    await asyncio.sleep(0.01)  # taken too
+    queue.put_nowait(5)
+    queue.put_nowait(6)
+    consumer.cancel()
+    await asyncio.gather(consumer, return_exceptions=True)
+
+    assert queue.qsize() == 6 and queue.overshoot == 4 and queue.full()
+    try:
+        queue.put_nowait(7)
+    except asyncio.QueueFull:
+        pass
+    assert [queue.get_nowait() for _ in range(6)] == [1, 2, 3, 4, 5, 6]
+
+
+async def main() -> None:
+    logging.getLogger().setLevel(logging.INFO)
+
+    await requeue()
+
+    results: dict[int, Any] = {}
+    for max_items in (1, 10, 100, 1000):
+        results[max_items] = await bench(
+            10_000, workers=4, max_items=max_items, max_wait=0.005, round_trip=0.001
+        )
+
+    logging.info('batch size: items/s (4 workers, 1 ms round trip per batch)')
+    for max_items, rate in results.items():
+        logging.info(f'{max_items:>10}: {rate:>12,.0f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,216 @@
+"""Asynchronous I/O - Deadline propagation by `contextvars`.
+
+Each `asyncio.timeout()` layer sets its own timeout, independently:
+downstream calls keep running after the outer request has expired.
+
+The deadline (`loop.time()` clock) of the current request is kept in a
+`ContextVar`:
+
+- `async with deadline(timeout):` scopes inherit the deadline, and can only
+  shorten it (`min()`), enforced by `asyncio.timeout_at()`.
+- Tasks created inside a scope copy the context, so inherit the deadline.
+- Client helpers read the remaining budget: they do not start work that can not
+  finish in time (`DeadlineExceeded`), and pass the budget on to servers
+  (e.g. MongoDB `maxTimeMS`), so server-side work is aborted too.
+
+Run: `python -m examples.core.asyncio_deadline`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import socket
+from collections.abc import Awaitable, Callable, Mapping
+from contextvars import ContextVar, Token
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Self, TypeVar
+
+if TYPE_CHECKING:
+    import aiomqtt
+    from motor.motor_asyncio import AsyncIOMotorCollection
+    from redis.asyncio import Redis
+
+R = TypeVar('R')
+
+# `loop.time()`, `math.inf` for no deadline
+_DEADLINE: ContextVar[float] = ContextVar('deadline', default=math.inf)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Not enough time left to start the work."""
+
+
+class Deadline:
+    """Deadline scope, see `deadline()`."""
+
+    def __init__(self, when: float) -> None:
+        self._requested = when
+        self.when = when
+        self._timeout: asyncio.Timeout | None = None
+        self._token: Token[float] | None = None
+
+    async def __aenter__(self) -> Self:
+        self.when = min(_DEADLINE.get(), self._requested)  # only shorten
+        self._token = _DEADLINE.set(self.when)
+        self._timeout = asyncio.timeout_at(None if math.isinf(self.when) else self.when)
+        await self._timeout.__aenter__()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        assert self._timeout is not None and self._token is not None
+        try:
+            await self._timeout.__aexit__(exc_type, exc_value, traceback)
+        finally:
+            _DEADLINE.reset(self._token)
+
+    def remaining(self) -> float:
+        return self.when - asyncio.get_running_loop().time()
+
+    def expired(self) -> bool:
+        return self._timeout is not None and self._timeout.expired()
+
+
+def deadline(timeout: float | None) -> Deadline:
+    """Scope of `timeout` seconds from now, or the inherited deadline if sooner.
+
+    Raise `TimeoutError` (and cancel the work) when the deadline is reached.
+    """
+    if timeout is None:
+        return Deadline(math.inf)
+    return Deadline(asyncio.get_running_loop().time() + timeout)
+
+
+def deadline_at(when: float | None) -> Deadline:
+    """Scope until `when` (`loop.time()` clock), or the inherited deadline if sooner."""
+    return Deadline(math.inf if when is None else when)
+
+
+def remaining() -> float:
+    """Seconds left of the current deadline, `math.inf` if none."""
+    when = _DEADLINE.get()
+    if math.isinf(when):
+        return math.inf
+    return when - asyncio.get_running_loop().time()
+
+
+def budget(min_budget: float = 0.0) -> float | None:
+    """Seconds left (`None` if no deadline), for client timeouts.
+
+    Raise `DeadlineExceeded` if less than `min_budget` seconds are left,
+    e.g. the expected latency of the call.
+    """
+    left = remaining()
+    if left <= min_budget:
+        raise DeadlineExceeded(f'{left:.3f} seconds left, {min_budget} required')
+    return None if math.isinf(left) else left
+
+
+async def call(fn: Callable[[], Awaitable[R]], *, min_budget: float = 0.0) -> R:
+    """`await fn()` within the remaining budget."""
+    async with asyncio.timeout(budget(min_budget)):
+        return await fn()
+
+
+# Client helpers
+
+
+async def redis_get(client: Redis, key: str, *, min_budget: float = 0.001) -> Any:
+    """`GET key`, within the remaining budget."""
+    return await call(lambda: client.get(key), min_budget=min_budget)
+
+
+async def mongo_find_one(
+    collection: AsyncIOMotorCollection,
+    filter_: Mapping[str, Any],
+    *,
+    min_budget: float = 0.002,
+    **kwargs: Any,
+) -> Any:
+    """`find_one()`, within the remaining budget, also enforced by server."""
+    left = budget(min_budget)
+    if left is None:
+        return await collection.find_one(filter_, **kwargs)
+    # Server aborts the query after `maxTimeMS`.
+    kwargs.setdefault('max_time_ms', max(1, int(left * 1000)))
+    async with asyncio.timeout(left):
+        return await collection.find_one(filter_, **kwargs)
+
+
+async def mqtt_publish(
+    client: aiomqtt.Client,
+    topic: str,
+    payload: str | bytes,
+    *,
+    qos: int = 0,
+    min_budget: float = 0.001,
+) -> None:
+    """`publish()`, within the remaining budget."""
+    await client.publish(topic, payload, qos=qos, timeout=budget(min_budget))
+
+
+async def sock_sendall(
+    sock: socket.socket, data: bytes, *, min_budget: float = 0.0
+) -> None:
+    loop = asyncio.get_running_loop()
+    await call(lambda: loop.sock_sendall(sock, data), min_budget=min_budget)
+
+
+async def sock_recv(sock: socket.socket, n: int, *, min_budget: float = 0.0) -> bytes:
+    loop = asyncio.get_running_loop()
+    return await call(lambda: loop.sock_recv(sock, n), min_budget=min_budget)
+
+
+async def main() -> None:
+    loop = asyncio.get_running_loop()
+
+    async with deadline(0.5) as outer:
+        # inner scope can not extend the deadline
+        async with deadline(10) as inner:
+            assert inner.when == outer.when
+            assert 0.4 < remaining() <= 0.5
+
+        # child tasks inherit the deadline
+        async def child() -> float:
+            return remaining()
+
+        assert await asyncio.create_task(child()) <= 0.5
+
+    # downstream calls do not start after the request has expired
+    a, b = socket.socketpair()
+    a.setblocking(False)
+    b.setblocking(False)
+    try:
+        async with deadline(0.1):
+            await sock_sendall(a, b'ping')
+            assert await sock_recv(b, 4) == b'ping'
+            await asyncio.sleep(0.095)
+            await sock_recv(b, 4, min_budget=0.01)  # expected latency
+    except DeadlineExceeded as err:
+        logging.info(f'not started: {err}')
+
+    # no reply: cut off at the deadline, not at a per-call timeout
+    t0 = loop.time()
+    try:
+        async with deadline(0.2):
+            await sock_recv(b, 4)
+    except TimeoutError:
+        logging.info(f'timed out after {loop.time() - t0:.3f} seconds')
+    finally:
+        a.close()
+        b.close()
+
+    assert math.isinf(remaining())
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.DEBUG, style='{', format='[{threadName} ({thread})] {message}'
+    )
+    asyncio.run(main())
@@ -0,0 +1,213 @@
+"""Asynchronous I/O - Deadline-aware Priority Queue.
+
+Items are ordered by earliest deadline (EDF) or by priority, and dropped
+(not returned) when their deadline has passed before a worker gets them.
+Under overload, capacity is not spent on work whose caller has given up.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, Generic, Literal, NoReturn, TypeVar
+
+logging.basicConfig(
+    level=logging.DEBUG, style='{', format='[{threadName} ({thread})] {message}'
+)
+
+T = TypeVar('T')
+
+
+@dataclass(slots=True)
+class Job(Generic[T]):
+    """Work item, `deadline` is on `time.monotonic()` clock (as `loop.time()`)."""
+
+    payload: T
+    deadline: float = math.inf
+    priority: int = 0  # lower first
+    enqueued_at: float = field(default=0.0, init=False)
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+
+@dataclass(slots=True)
+class QueueStats:
+    put: int = 0
+    got: int = 0
+    dropped: int = 0
+    wait_total: float = 0.0  # seconds, of got items
+    wait_max: float = 0.0
+
+    @property
+    def wait_mean(self) -> float:
+        return self.wait_total / self.got if self.got else 0.0
+
+
+class DeadlineQueue(asyncio.Queue[Job[T]]):
+    """Queue of `Job`, by earliest deadline first, or by priority.
+
+    Expired jobs are dropped on `get()` (and when the queue is full on `put()`),
+    `on_drop` is called for each of them, and they count as done for `join()`.
+
+    :param `min_remaining`: seconds, jobs with less time left are expired too,
+        e.g. the expected service time: they can not be done in time anyway.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        *,
+        order: Literal['deadline', 'priority'] = 'deadline',
+        on_drop: Callable[[Job[T]], Any] | None = None,
+        min_remaining: float = 0.0,
+    ) -> None:
+        self.order = order
+        self.on_drop = on_drop
+        self.min_remaining = min_remaining
+        self.stats = QueueStats()
+        self._seq = itertools.count()  # FIFO among equal keys
+        super().__init__(maxsize)
+
+    # Override these methods to implement other queue organizations
+    # (e.g. stack or priority queue).
+    # These will only be called with appropriate locks held
+
+    def _init(self, maxsize: int) -> None:  # pylint: disable=unused-argument
+        # pylint: disable-next=attribute-defined-outside-init
+        self._queue: list[tuple[float, float, int, Job[T]]] = []
+
+    def _put(self, item: Job[T]) -> None:
+        item.enqueued_at = time.monotonic()
+        key: tuple[float, float]
+        if self.order == 'deadline':
+            key = (item.deadline, item.priority)
+        else:
+            key = (item.priority, item.deadline)
+        heapq.heappush(self._queue, (*key, next(self._seq), item))
+        self.stats.put += 1
+
+    def _get(self) -> Job[T]:
+        return heapq.heappop(self._queue)[-1]
+
+    def _drop(self, item: Job[T]) -> None:
+        self.stats.dropped += 1
+        self.task_done()
+        if self.on_drop is not None:
+            self.on_drop(item)
+
+    def purge(self) -> int:
+        """Drop all expired jobs, return the number of them."""
+        expire_at = time.monotonic() + self.min_remaining
+        expired = [e for e in self._queue if e[-1].deadline <= expire_at]
+        if expired:
+            self._queue[:] = [e for e in self._queue if e[-1].deadline > expire_at]
+            heapq.heapify(self._queue)
+            for entry in expired:
+                self._drop(entry[-1])
+                self._wakeup_next(self._putters)  # type: ignore[attr-defined]
+        return len(expired)
+
+    def put_nowait(self, item: Job[T]) -> None:
+        if self.full():
+            self.purge()
+        super().put_nowait(item)
+
+    async def put(self, item: Job[T]) -> None:
+        if self.full():
+            self.purge()
+        await super().put(item)
+
+    def get_nowait(self) -> Job[T]:
+        while True:
+            item = super().get_nowait()  # raise `QueueEmpty`
+            now = time.monotonic()
+            if item.deadline > now + self.min_remaining:
+                wait = now - item.enqueued_at
+                self.stats.got += 1
+                self.stats.wait_total += wait
+                self.stats.wait_max = max(self.stats.wait_max, wait)
+                return item
+            self._drop(item)
+
+    async def get(self) -> Job[T]:
+        while True:
+            try:
+                return await super().get()  # call `get_nowait()`
+            except asyncio.QueueEmpty:
+                # all ready jobs had expired, wait again
+                continue
+
+    async def submit(
+        self, payload: T, *, timeout: float | None = None, priority: int = 0
+    ) -> Job[T]:
+        deadline = math.inf if timeout is None else time.monotonic() + timeout
+        job = Job(payload, deadline, priority)
+        await self.put(job)
+        return job
+
+
+async def worker(queue: asyncio.Queue[Job[float]], done: list[bool]) -> NoReturn:
+    while True:
+        job = await queue.get()
+        await asyncio.sleep(job.payload)
+        done.append(job.remaining() > 0)  # still useful for the caller?
+        queue.task_done()
+
+
+async def overload(queue: asyncio.Queue[Job[float]], workers: int) -> list[bool]:
+    """Offer 2x the capacity of workers, each caller waits for 50 ms at most."""
+    done: list[bool] = []
+    tasks = [asyncio.create_task(worker(queue, done)) for _ in range(workers)]
+
+    service_time = 0.001
+    for _ in range(250):
+        for _ in range(workers * 2):
+            queue.put_nowait(Job(service_time, time.monotonic() + 0.05))
+        await asyncio.sleep(service_time)
+    await queue.join()
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return done
+
+
+async def main() -> None:
+    fifo: asyncio.Queue[Job[float]] = asyncio.Queue()
+    done = await overload(fifo, workers=4)
+    logging.info(f'FIFO: {len(done)} processed, {sum(done)} in time')
+
+    dropped: list[Job[float]] = []
+    queue: DeadlineQueue[float] = DeadlineQueue(
+        on_drop=dropped.append, min_remaining=0.002
+    )
+    done = await overload(queue, workers=4)
+    logging.info(
+        f'EDF: {len(done)} processed, {sum(done)} in time, '
+        f'{queue.stats.dropped} dropped ({len(dropped)} reported), '
+        f'wait mean {queue.stats.wait_mean * 1000:.1f} ms, '
+        f'max {queue.stats.wait_max * 1000:.1f} ms'
+    )
+
+    # priority order
+    pq: DeadlineQueue[str] = DeadlineQueue(order='priority')
+    await pq.submit('low', priority=9)
+    await pq.submit('high', priority=0)
+    await pq.submit('expired', timeout=-1)
+    assert (await pq.get()).payload == 'high'  # 'expired' dropped
+    assert (await pq.get()).payload == 'low'
+    pq.task_done()
+    pq.task_done()
+    assert pq.stats.dropped == 1
+    await pq.join()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,295 @@
+"""Asynchronous I/O - Named, bounded thread pools for blocking calls.
+
+`asyncio.to_thread()` and `loop.getaddrinfo()` (DNS resolution) share the loop's
+single default executor, with an unbounded queue: a burst of slow file I/O queues
+up in front of DNS lookups, and everything else that needs a thread.
+
+An `ExecutorRegistry` of named pools (e.g. `io`, `dns`, `cpu`):
+
+- each pool has its own threads, and a bounded queue (`queue_size`):
+  when full, `offload()` waits (backpressure), or raises `ExecutorSaturated`
+  (`reject=True`), instead of queueing without bound;
+- `await offload('io', fn, *args, **kwargs)`, like `asyncio.to_thread()`
+  (`contextvars` are copied into the thread);
+- `install_default('dns')`: the loop's default executor, used by
+  `loop.getaddrinfo()`, `loop.run_in_executor(None, ...)`, `asyncio.to_thread()`;
+- metrics of each pool: queue wait and service time histograms, in flight,
+  queued, saturation (busy threads / threads), rejections.
+
+A slot is released when the call completes in its thread, not when the caller
+is cancelled (the thread can not be interrupted), so the bound holds.
+
+Run: `python -m examples.core.asyncio_executors`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, ParamSpec, TypeVar
+
+from examples.core.asyncio_queue_metrics import Histogram
+
+P = ParamSpec('P')
+R = TypeVar('R')
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ExecutorSaturated(RuntimeError):
+    """Threads are busy and the queue is full."""
+
+
+def _timed(fn: Callable[[], R]) -> tuple[float, float, R]:
+    """Run in a worker thread: (start time, end time, result)."""
+    started_at = time.perf_counter()
+    result = fn()
+    return started_at, time.perf_counter(), result
+
+
+class BoundedExecutor:  # pylint: disable=too-many-instance-attributes
+    """`ThreadPoolExecutor` with at most `max_workers + queue_size` calls in flight.
+
+    Metrics are recorded in the event loop thread, no locking.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        queue_size: int | None = None,
+        *,
+        reject: bool = False,
+    ) -> None:
+        if max_workers < 1:
+            raise ValueError('max_workers must be >= 1')
+        self.name = name
+        self.max_workers = max_workers
+        self.queue_size = max_workers * 4 if queue_size is None else queue_size
+        self.reject = reject
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix=name)
+        self._slots = asyncio.Semaphore(max_workers + self.queue_size)
+        self.in_flight = 0
+
+        self.wait = Histogram()
+        self.service = Histogram()
+        self.rejected = 0
+        self._started_at = time.perf_counter()
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__} {self.name!r} workers={self.max_workers} '
+            f'in_flight={self.in_flight}>'
+        )
+
+    @property
+    def queued(self) -> int:
+        return max(0, self.in_flight - self.max_workers)
+
+    @property
+    def saturation(self) -> float:
+        """Busy threads / threads."""
+        return min(self.in_flight, self.max_workers) / self.max_workers
+
+    @property
+    def utilisation(self) -> float:
+        """Busy time / (elapsed time * threads)."""
+        elapsed = time.perf_counter() - self._started_at
+        return self.service.sum / (elapsed * self.max_workers) if elapsed else 0.0
+
+    async def run(self, fn: Callable[P, R], /, *args: P.args, **kwargs: P.kwargs) -> R:
+        if self.reject and self._slots.locked():
+            self.rejected += 1
+            raise ExecutorSaturated(f'executor {self.name!r} is saturated')
+        await self._slots.acquire()
+
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        call = functools.partial(
+            ctx.run, _timed, functools.partial(fn, *args, **kwargs)
+        )
+        submitted_at = time.perf_counter()
+        try:
+            future = self.executor.submit(call)
+        except BaseException:
+            self._slots.release()
+            raise
+        self.in_flight += 1
+
+        def done(f: Future[tuple[float, float, R]]) -> None:
+            # in the worker thread
+            loop.call_soon_threadsafe(self._done, f, submitted_at)
+
+        future.add_done_callback(done)
+        _, _, result = await asyncio.wrap_future(future)
+        return result
+
+    def _done(
+        self, future: Future[tuple[float, float, Any]], submitted_at: float
+    ) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+        if not future.cancelled() and future.exception() is None:
+            started_at, finished_at, _ = future.result()
+            self.wait.observe(started_at - submitted_at)
+            self.service.observe(finished_at - started_at)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            'max_workers': self.max_workers,
+            'queue_size': self.queue_size,
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'saturation': self.saturation,
+            'utilisation': self.utilisation,
+            'rejected': self.rejected,
+            'wait_seconds': self.wait.snapshot().as_dict(),
+            'service_seconds': self.service.snapshot().as_dict(),
+        }
+
+
+class ExecutorRegistry:
+    """Named `BoundedExecutor`s."""
+
+    def __init__(self) -> None:
+        self._executors: dict[str, BoundedExecutor] = {}
+
+    def __getitem__(self, name: str) -> BoundedExecutor:
+        return self._executors[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._executors
+
+    def register(
+        self,
+        name: str,
+        max_workers: int,
+        queue_size: int | None = None,
+        *,
+        reject: bool = False,
+    ) -> BoundedExecutor:
+        if name in self._executors:
+            raise ValueError(f'executor {name!r} already registered')
+        executor = BoundedExecutor(name, max_workers, queue_size, reject=reject)
+        self._executors[name] = executor
+        return executor
+
+    async def offload(
+        self, name: str, fn: Callable[P, R], /, *args: P.args, **kwargs: P.kwargs
+    ) -> R:
+        """`await fn(*args, **kwargs)` in the thread pool `name`."""
+        return await self._executors[name].run(fn, *args, **kwargs)
+
+    def install_default(
+        self, name: str, loop: asyncio.AbstractEventLoop | None = None
+    ) -> None:
+        """Use the threads of pool `name` as the loop's default executor.
+
+        **NOTE**: Calls through the default executor bypass the bound and metrics.
+        """
+        (loop or asyncio.get_running_loop()).set_default_executor(
+            self._executors[name].executor
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        for executor in self._executors.values():
+            executor.shutdown(wait)
+        self._executors.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {name: e.snapshot() for name, e in self._executors.items()}
+
+
+REGISTRY = ExecutorRegistry()
+
+
+def configure_default_pools(registry: ExecutorRegistry = REGISTRY) -> None:
+    """`io`: file I/O, `dns`: name resolution, `cpu`: GIL-releasing C code
+    (e.g. `hashlib`, `zlib`)."""
+    cpus = os.cpu_count() or 1
+    registry.register('io', 16, 256)
+    registry.register('dns', 4, 64)
+    registry.register('cpu', cpus, cpus * 4)
+
+
+async def offload(
+    name: str, fn: Callable[P, R], /, *args: P.args, **kwargs: P.kwargs
+) -> R:
+    """`await fn(*args, **kwargs)` in the thread pool `name` of `REGISTRY`."""
+    return await REGISTRY.offload(name, fn, *args, **kwargs)
+
+
+def slow_file_io() -> None:
+    time.sleep(0.2)  # e.g. reading a large file from a slow disk
+
+
+async def dns_latency(loop: asyncio.AbstractEventLoop) -> float:
+    t0 = time.perf_counter()
+    await loop.getaddrinfo('localhost', 80)
+    return time.perf_counter() - t0
+
+
+async def main() -> None:
+    loop = asyncio.get_running_loop()
+
+    # shared default executor: a burst of file I/O starves DNS resolution
+    shared = ThreadPoolExecutor(8)
+    loop.set_default_executor(shared)
+    burst = [asyncio.create_task(asyncio.to_thread(slow_file_io)) for _ in range(80)]
+    await asyncio.sleep(0.01)
+    LOGGER.info(f'shared pool: DNS lookup took {await dns_latency(loop):.3f} seconds')
+    await asyncio.gather(*burst)
+    shared.shutdown()
+
+    # named pools
+    configure_default_pools()
+    REGISTRY.install_default('dns')
+    burst = [asyncio.create_task(offload('io', slow_file_io)) for _ in range(80)]
+    await asyncio.sleep(0.01)
+    LOGGER.info(f'named pools: DNS lookup took {await dns_latency(loop):.3f} seconds')
+    io = REGISTRY['io']
+    LOGGER.info(
+        f'io: in flight {io.in_flight}, queued {io.queued}, '
+        f'saturation {io.saturation:.2f}'
+    )
+    await asyncio.gather(*burst)
+    wait = io.wait.snapshot()
+    LOGGER.info(
+        f'io: queue wait p50 {wait.quantile(0.5):.3f}, p99 {wait.quantile(0.99):.3f} '
+        f'seconds, utilisation {io.utilisation:.2f}'
+    )
+
+    # bounded queue: reject when full
+    small = REGISTRY.register('small', 1, 1, reject=True)
+    first = asyncio.create_task(offload('small', time.sleep, 0.1))
+    second = asyncio.create_task(offload('small', time.sleep, 0.1))
+    await asyncio.sleep(0)
+    try:
+        await offload('small', time.sleep, 0.1)
+    except ExecutorSaturated as err:
+        LOGGER.info(err)
+    await asyncio.gather(first, second)
+    assert small.rejected == 1 and small.in_flight == 0
+
+    # contextvars are copied into the thread
+    var: contextvars.ContextVar[str] = contextvars.ContextVar('var')
+    var.set('request-1')
+    assert await offload('io', var.get) == 'request-1'
+
+    REGISTRY.shutdown()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.DEBUG, style='{', format='[{threadName} ({thread})] {message}'
+    )
+    asyncio.run(main())
@@ -0,0 +1,193 @@
+"""Asynchronous I/O - Hedged requests, to cut tail latency.
+
+Start the call; if it has not finished after `delay` (e.g. its p95 latency),
+start a backup attempt, take the first success, and cancel the rest.
+At most 5% of calls are hedged at p95, but the slow tail is cut off.
+
+`LatencyTracker` keeps recent latencies in a ring buffer, so the delay follows
+the observed p95 latency. The first attempt of every call is recorded, whether
+it wins or not: recording winners only would hide the slow tail that hedging
+cuts off, and bias p95 (so the delay) low.
+
+**NOTE**: Only for idempotent calls (reads), attempts run concurrently.
+
+Run: `python -m examples.core.asyncio_hedged`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import random
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+logging.basicConfig(
+    level=logging.DEBUG, style='{', format='[{threadName} ({thread})] {message}'
+)
+
+R = TypeVar('R')
+
+
+class LatencyTracker:
+    """Quantiles of the last `size` latencies (seconds).
+
+    Quantiles are recomputed (sorted) every `size // 10` observations,
+    not on every read.
+    """
+
+    def __init__(self, size: int = 1000, default: float = 0.05) -> None:
+        self.size = size
+        self.default = default  # before enough observations
+        self._ring: list[float] = []
+        self._index = 0
+        self._sorted: list[float] = []
+        self._stale = 0
+
+    def observe(self, latency: float) -> None:
+        if len(self._ring) < self.size:
+            self._ring.append(latency)
+        else:
+            self._ring[self._index] = latency
+            self._index = (self._index + 1) % self.size
+        self._stale += 1
+
+    def quantile(self, q: float) -> float:
+        if self._stale > max(1, self.size // 10) or not self._sorted:
+            self._sorted = sorted(self._ring)
+            self._stale = 0
+        if len(self._sorted) < 20:  # too few samples
+            return self.default
+        index = min(len(self._sorted) - 1, math.ceil(q * len(self._sorted)))
+        return self._sorted[index]
+
+
+async def hedged(
+    call: Callable[[], Awaitable[R]],
+    *,
+    delay: float | None = None,
+    max_attempts: int = 2,
+    tracker: LatencyTracker | None = None,
+    quantile: float = 0.95,
+) -> R:
+    """Call `call()`, with up to `max_attempts - 1` backup attempts.
+
+    A backup attempt starts when no attempt has succeeded within `delay`
+    seconds (default: `quantile` of `tracker`), or at once when all running
+    attempts have failed. The first success is returned, other attempts are
+    cancelled. If all attempts fail, the last error is raised.
+
+    Latency of the first attempt is recorded into `tracker`: in full if it
+    succeeds, or the time it has run when cancelled (a lower bound) if a backup
+    attempt wins. Failed attempts are not recorded.
+    """
+    if delay is None:
+        delay = tracker.quantile(quantile) if tracker is not None else 0.05
+
+    loop = asyncio.get_running_loop()
+    started_at: dict[asyncio.Future[R], float] = {}
+    error: BaseException | None = None
+
+    def attempt() -> asyncio.Future[R]:
+        task = asyncio.ensure_future(call())
+        started_at[task] = loop.time()
+        return task
+
+    first = attempt()
+    pending: set[asyncio.Future[R]] = {first}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=delay if len(started_at) < max_attempts else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                if task.cancelled():
+                    continue
+                error = task.exception()
+                if error is None:
+                    if tracker is not None and (task is first or first in pending):
+                        # a slower first attempt is cut off: a lower bound
+                        tracker.observe(loop.time() - started_at[first])
+                    return task.result()
+            if len(started_at) < max_attempts and (not done or not pending):
+                # timed out: hedge; or all failed: retry at once
+                pending.add(attempt())
+        assert error is not None
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def service(rng: random.Random) -> str:
+    """2% of calls are slow (200 ms), others take 5 ms."""
+    await asyncio.sleep(0.2 if rng.random() < 0.02 else 0.005)
+    return 'ok'
+
+
+async def main() -> None:
+    rng = random.Random(42)
+
+    async def run(hedge: bool) -> tuple[list[float], int]:
+        tracker = LatencyTracker()
+        attempts = 0
+
+        async def call() -> str:
+            nonlocal attempts
+            attempts += 1
+            return await service(rng)
+
+        latencies: list[float] = []
+
+        async def one() -> None:
+            t0 = time.perf_counter()
+            if hedge:
+                await hedged(call, tracker=tracker)
+            else:
+                await call()
+            latencies.append(time.perf_counter() - t0)
+
+        for _ in range(20):  # 20 rounds of 50 concurrent requests
+            await asyncio.gather(*(one() for _ in range(50)))
+        return latencies, attempts
+
+    for hedge in (False, True):
+        latencies, attempts = await run(hedge)
+        q = statistics.quantiles(latencies, n=100)
+        logging.info(
+            f'hedged={hedge}: p50 {q[49] * 1000:.1f} ms, p99 {q[98] * 1000:.1f} ms, '
+            f'max {max(latencies) * 1000:.1f} ms, '
+            f'attempts {attempts / len(latencies):.3f} per request'
+        )
+
+    # errors: retry at once, the last error is raised
+    failures = 0
+
+    async def flaky() -> str:
+        nonlocal failures
+        failures += 1
+        if failures < 2:
+            raise ConnectionError('reset')
+        return 'ok'
+
+    assert await hedged(flaky, delay=10) == 'ok'
+
+    async def broken() -> str:
+        raise ConnectionError('down')
+
+    try:
+        await hedged(broken, max_attempts=3)
+    except ConnectionError:
+        pass
+    else:
+        assert False
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,239 @@
+"""Asynchronous I/O - Offload CPU-bound work to an adaptive process pool.
+
+`asyncio.to_thread()` does not help CPU-bound work under the GIL.
+Items are sent to a `ProcessPoolExecutor` by `loop.run_in_executor()`:
+
+- Small items are batched into chunks (`BatchQueue.get_batch()`),
+  so pickling and IPC are amortised. Chunk size is chosen from an EWMA of the
+  per-item service time, measured in worker processes.
+- Pool size follows the backlog: `(queued + in-flight items) * service time`,
+  i.e. the workers needed to drain it within `resize_interval` seconds.
+  The pool is replaced by a new one of the target size, the old one finishes
+  its in-flight chunks in the background.
+
+Run: `python -m examples.core.asyncio_process_offload`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from types import TracebackType
+from typing import Any, Generic, Self, TypeVar
+
+from examples.core.asyncio_batch_queue import BatchQueue
+
+logging.basicConfig(
+    level=logging.DEBUG, style='{', format='[{threadName} ({thread})] {message}'
+)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# Pools are created while threads are running (the default executor, the
+# management thread of the previous pool): start workers from a fork server,
+# not by forking this process.
+MP_CONTEXT = multiprocessing.get_context('forkserver')
+
+
+def _run_chunk(
+    func: Callable[[T], R], items: Sequence[T]
+) -> tuple[list[tuple[bool, R | BaseException]], float]:
+    """Run in worker process, return results (`(ok, value)`) and elapsed time."""
+    results: list[tuple[bool, R | BaseException]] = []
+    t0 = time.perf_counter()
+    for item in items:
+        try:
+            results.append((True, func(item)))
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            results.append((False, err))
+    return results, time.perf_counter() - t0
+
+
+class ProcessOffloader(Generic[T, R]):  # pylint: disable=too-many-instance-attributes
+    """Run `func(item)` in a process pool, adapting chunk size and pool size.
+
+    `func` and items must be picklable (e.g. a module-level function).
+    """
+
+    def __init__(
+        self,
+        func: Callable[[T], R],
+        *,
+        min_workers: int = 1,
+        max_workers: int | None = None,
+        chunk_time: float = 0.01,
+        max_chunk: int = 1000,
+        max_wait: float = 0.001,
+        resize_interval: float = 0.5,
+        alpha: float = 0.2,
+    ) -> None:
+        """
+        :param `chunk_time`: target service time of one chunk, in seconds
+        :param `max_wait`: max time to wait for a chunk to fill up, in seconds
+        :param `alpha`: EWMA smoothing factor of per-item service time
+        """
+        self.func = func
+        self.min_workers = min_workers
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_time = chunk_time
+        self.max_chunk = max_chunk
+        self.max_wait = max_wait
+        self.resize_interval = resize_interval
+        self.alpha = alpha
+
+        self.workers = min_workers
+        self.item_time: float | None = None  # EWMA, seconds
+        self.resizes = 0
+
+        self._queue: BatchQueue[tuple[T, asyncio.Future[R]]] = BatchQueue()
+        self._pool = ProcessPoolExecutor(self.workers, mp_context=MP_CONTEXT)
+        self._inflight = 0  # chunks
+        self._inflight_items = 0
+        self._slots = asyncio.Condition()
+        self._tasks: set[asyncio.Task[Any]] = set()
+
+    async def __aenter__(self) -> Self:
+        for coro in (self._dispatch(), self._autoscale()):
+            task = asyncio.create_task(coro)
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.to_thread(self._pool.shutdown)
+
+    @property
+    def chunk_size(self) -> int:
+        if self.item_time is None:
+            return 1  # no measurement yet
+        return max(1, min(self.max_chunk, int(self.chunk_time / self.item_time)))
+
+    async def submit(self, item: T) -> R:
+        future: asyncio.Future[R] = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def _dispatch(self) -> None:
+        while True:
+            async with self._slots:
+                # Keep backlog in our queue (visible), not in the executor.
+                await self._slots.wait_for(lambda: self._inflight < 2 * self.workers)
+                self._inflight += 1
+            batch = await self._queue.get_batch(self.chunk_size, self.max_wait)
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[T, asyncio.Future[R]]]) -> None:
+        loop = asyncio.get_running_loop()
+        self._inflight_items += len(batch)
+        try:
+            results, elapsed = await loop.run_in_executor(
+                self._pool, _run_chunk, self.func, [item for item, _ in batch]
+            )
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            # e.g. `BrokenProcessPool`, pickling errors
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(err)
+        else:
+            t = elapsed / len(batch)
+            self.item_time = (
+                t
+                if self.item_time is None
+                else self.alpha * t + (1 - self.alpha) * self.item_time
+            )
+            for (_, future), (ok, value) in zip(batch, results):
+                if future.done():  # cancelled by caller
+                    continue
+                if ok:
+                    future.set_result(value)  # type: ignore[arg-type]
+                else:
+                    future.set_exception(value)  # type: ignore[arg-type]
+        finally:
+            self._inflight_items -= len(batch)
+            self._queue.task_done(len(batch))
+            async with self._slots:
+                self._inflight -= 1
+                self._slots.notify()
+
+    async def _autoscale(self) -> None:
+        while True:
+            await asyncio.sleep(self.resize_interval)
+            if self.item_time is None:
+                continue
+            backlog = self._queue.qsize() + self._inflight_items
+            demand = math.ceil(backlog * self.item_time / self.resize_interval)
+            target = max(self.min_workers, min(self.max_workers, demand))
+            # grow at once, shrink lazily (hysteresis)
+            if target > self.workers or target < self.workers // 2:
+                await self._resize(target)
+
+    async def _resize(self, workers: int) -> None:
+        logging.debug(f'resize process pool: {self.workers} -> {workers}')
+        old = self._pool
+        self._pool = ProcessPoolExecutor(workers, mp_context=MP_CONTEXT)
+        # In-flight chunks of the old pool complete, then its processes exit.
+        old.shutdown(wait=False)
+        self.resizes += 1
+        async with self._slots:
+            self.workers = workers
+            self._slots.notify_all()
+
+
+def cpu_work(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+async def bench_to_thread(items: Sequence[int]) -> None:
+    await asyncio.gather(*(asyncio.to_thread(cpu_work, n) for n in items))
+
+
+async def bench_per_item(items: Sequence[int]) -> None:
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(mp_context=MP_CONTEXT) as pool:
+        await asyncio.gather(*(loop.run_in_executor(pool, cpu_work, n) for n in items))
+
+
+async def bench_offloader(items: Sequence[int]) -> None:
+    async with ProcessOffloader(cpu_work) as offloader:
+        results = await asyncio.gather(*(offloader.submit(n) for n in items))
+        logging.info(
+            f'workers: {offloader.workers}, resizes: {offloader.resizes}, '
+            f'chunk size: {offloader.chunk_size}, '
+            f'item time: {(offloader.item_time or 0) * 1e6:.1f} us'
+        )
+    assert results[0] == cpu_work(items[0])
+
+
+async def main() -> None:
+    logging.getLogger().setLevel(logging.INFO)
+
+    items = [1000] * 50_000
+    for bench in (bench_to_thread, bench_per_item, bench_offloader):
+        t0 = time.perf_counter()
+        await bench(items)
+        logging.info(f'{bench.__name__}: {time.perf_counter() - t0:.2f} seconds')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
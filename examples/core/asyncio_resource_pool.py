@@ -0,0 +1,507 @@
+"""Asynchronous I/O - Resource (connection) pool.
+
+`async with pool.acquire() as conn:` borrows a resource, and returns it when done.
+
+- **Lazy creation**: resources are created on demand, up to `max_size`;
+  then borrowers wait (FIFO), a returned resource is handed over directly,
+  so is the slot of a discarded one (the waiter creates a new resource in it).
+- **LIFO reuse**: the most recently returned resource is borrowed first,
+  to keep a few connections warm (and let the others go idle and be evicted),
+  instead of cycling through all of them (FIFO) so none ever goes idle.
+- **Idle eviction**: resources idle for more than `max_idle` seconds are closed,
+  down to `min_size`.
+- **Health checks on borrow**: `check(resource)` for resources idle for more than
+  `check_after` seconds, broken ones are closed and replaced.
+- A resource is discarded (not returned to the pool) when the `async with` block
+  raises: its state (e.g. half-read response) is unknown.
+- **Metrics**: wait time and hold time histograms, size, in use, utilisation.
+
+`tcp_pool()` and `unix_pool()` pool stream connections
+(`asyncio.open_connection()`, `asyncio.open_unix_connection()`).
+
+Run: `python -m examples.core.asyncio_resource_pool`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import inspect
+import logging
+import os
+import tempfile
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from types import TracebackType
+from typing import Any, Generic, Self, TypeVar
+
+from examples.core.asyncio_amap import amap
+from examples.core.asyncio_queue_metrics import Histogram
+
+R = TypeVar('R')
+
+Connection = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+LOGGER = logging.getLogger(__name__)
+
+
+class PoolClosed(RuntimeError):
+    pass
+
+
+class _Entry(Generic[R]):
+    __slots__ = ('resource', 'created_at', 'returned_at')
+
+    def __init__(self, resource: R, now: float) -> None:
+        self.resource = resource
+        self.created_at = now
+        self.returned_at = now
+
+
+class ResourcePool(Generic[R]):  # pylint: disable=too-many-instance-attributes
+    """Pool of resources made by `create()`, closed by `close()`.
+
+    :param `min_size`: idle resources are not evicted below it
+    :param `max_size`: max resources, in use or idle
+    :param `max_idle`: close resources idle for longer, in seconds
+    :param `max_lifetime`: close resources older than it on return, in seconds
+    :param `check`: health check, `True` if the resource is usable
+    :param `check_after`: check resources idle for longer, in seconds
+    :param `acquire_timeout`: max wait for a resource, in seconds
+    """
+
+    def __init__(
+        self,
+        create: Callable[[], Awaitable[R]],
+        close: Callable[[R], Awaitable[None] | None],
+        *,
+        min_size: int = 0,
+        max_size: int = 10,
+        max_idle: float = 60.0,
+        max_lifetime: float | None = None,
+        check: Callable[[R], Awaitable[bool] | bool] | None = None,
+        check_after: float = 1.0,
+        acquire_timeout: float | None = None,
+    ) -> None:
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError('0 <= min_size <= max_size, 1 <= max_size required')
+        self._create = create
+        self._close = close
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self._check = check
+        self.check_after = check_after
+        self.acquire_timeout = acquire_timeout
+
+        self._idle: list[_Entry[R]] = []  # stack: most recently returned last
+        self._size = 0  # in use + idle + being created
+        self._waiters: deque[asyncio.Future[_Entry[R] | None]] = deque()
+        self._closed = False
+        self._reaper: asyncio.Task[None] | None = None
+
+        # metrics
+        self.wait = Histogram()
+        self.hold = Histogram()
+        self.created = 0
+        self.evicted = 0
+        self.discarded = 0
+        self.failed_checks = 0
+        self.timeouts = 0
+        self._started_at = time.perf_counter()
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__} size={self._size} idle={len(self._idle)} '
+            f'waiters={len(self._waiters)}>'
+        )
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    @property
+    def in_use(self) -> int:
+        return self._size - len(self._idle)
+
+    @property
+    def utilisation(self) -> float:
+        """Hold time / (elapsed time * `max_size`)."""
+        elapsed = time.perf_counter() - self._started_at
+        return self.hold.sum / (elapsed * self.max_size) if elapsed else 0.0
+
+    async def __aenter__(self) -> Self:
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap())
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> AsyncIterator[R]:
+        t0 = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.acquire_timeout):
+                entry = await self._get()
+        except TimeoutError:
+            self.timeouts += 1
+            raise
+        t1 = time.perf_counter()
+        self.wait.observe(t1 - t0)
+        discard = True
+        try:
+            yield entry.resource
+            discard = False
+        finally:
+            self.hold.observe(time.perf_counter() - t1)
+            await self._put(entry, discard)
+
+    async def _get(self) -> _Entry[R]:
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._closed:
+                raise PoolClosed('pool is closed')
+
+            if self._idle:
+                entry = self._idle.pop()  # LIFO
+                if loop.time() - entry.returned_at > self.check_after:
+                    try:
+                        healthy = await self._healthy(entry)
+                    except BaseException:
+                        # cancelled during the check (e.g. acquire timeout):
+                        # neither idle nor borrowed, its slot goes to a waiter
+                        await self._discard(entry)
+                        raise
+                    if not healthy:
+                        self.failed_checks += 1
+                        await self._discard(entry)
+                        continue
+                return entry
+
+            if self._size < self.max_size:
+                self._size += 1
+                return await self._create_entry()
+
+            waiter: asyncio.Future[_Entry[R] | None] = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                handed = await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    handed = waiter.result()
+                    if handed is not None:  # handed over, then cancelled
+                        await self._put(handed, discard=False)
+                    else:
+                        self._release_slot()
+                raise
+            if handed is not None:
+                return handed  # just returned, no check
+            # `None`: a free slot, handed over (still counted in `_size`)
+            if self._closed:
+                self._release_slot()
+                raise PoolClosed('pool is closed')
+            return await self._create_entry()
+
+    async def _create_entry(self) -> _Entry[R]:
+        """Create a resource in a slot already counted in `_size`."""
+        try:
+            resource = await self._create()
+        except BaseException:
+            self._release_slot()  # a waiter may create one
+            raise
+        self.created += 1
+        return _Entry(resource, asyncio.get_running_loop().time())
+
+    async def _healthy(self, entry: _Entry[R]) -> bool:
+        if self._check is None:
+            return True
+        try:
+            result = self._check(entry.resource)
+            if inspect.isawaitable(result):
+                result = await result
+            return bool(result)
+        except Exception:  # pylint: disable=broad-exception-caught
+            return False
+
+    async def _put(self, entry: _Entry[R], discard: bool) -> None:
+        now = asyncio.get_running_loop().time()
+        if (
+            discard
+            or self._closed
+            or (
+                self.max_lifetime is not None
+                and now - entry.created_at > self.max_lifetime
+            )
+        ):
+            if discard:
+                self.discarded += 1
+            await self._discard(entry)
+            return
+        entry.returned_at = now
+        if not self._wake_up(entry):
+            self._idle.append(entry)
+
+    def _wake_up(self, entry: _Entry[R] | None) -> bool:
+        """Hand `entry` (or a free slot if `None`) to the first waiter.
+
+        Handed over, not just freed: a borrower arriving in between can not
+        take it, the waiter keeps its place in line.
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(entry)
+                return True
+        return False
+
+    def _release_slot(self) -> None:
+        if not self._wake_up(None):
+            self._size -= 1
+
+    async def _discard(self, entry: _Entry[R]) -> None:
+        self._release_slot()
+        await self._close_resource(entry.resource)
+
+    async def _close_resource(self, resource: R) -> None:
+        try:
+            result = self._close(resource)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:  # pylint: disable=broad-exception-caught
+            LOGGER.exception(f'error closing {resource!r}')
+
+    async def _reap(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(max(self.max_idle / 2, 0.01))
+            # least recently returned first (bottom of the stack)
+            deadline = loop.time() - self.max_idle
+            while (
+                self._idle
+                and self._size > self.min_size
+                and self._idle[0].returned_at < deadline
+            ):
+                entry = self._idle.pop(0)
+                self.evicted += 1
+                await self._discard(entry)
+
+    async def aclose(self) -> None:
+        """Close idle resources, in-use ones are closed when returned."""
+        self._closed = True
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        idle, self._idle = self._idle, []
+        for entry in idle:
+            await self._discard(entry)
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_exception(PoolClosed('pool is closed'))
+        self._waiters.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            'size': self._size,
+            'idle': len(self._idle),
+            'in_use': self.in_use,
+            'waiters': len(self._waiters),
+            'utilisation': self.utilisation,
+            'wait_seconds': self.wait.snapshot().as_dict(),
+            'hold_seconds': self.hold.snapshot().as_dict(),
+            'created': self.created,
+            'evicted': self.evicted,
+            'discarded': self.discarded,
+            'failed_checks': self.failed_checks,
+            'timeouts': self.timeouts,
+        }
+
+
+# Stream connections
+
+
+def connection_alive(conn: Connection) -> bool:
+    """Not closed locally, no EOF (or pending data) from peer."""
+    reader, writer = conn
+    pending = reader._buffer  # type: ignore[attr-defined]  # pylint: disable=protected-access
+    return not writer.is_closing() and not reader.at_eof() and not pending
+
+
+async def close_connection(conn: Connection) -> None:
+    _, writer = conn
+    writer.close()
+    with contextlib.suppress(OSError):
+        await writer.wait_closed()
+
+
+def tcp_pool(host: str, port: int, **kwargs: Any) -> ResourcePool[Connection]:
+    """Pool of `asyncio.open_connection(host, port)`, `kwargs` of `ResourcePool`."""
+    return ResourcePool(
+        lambda: asyncio.open_connection(host, port),
+        close_connection,
+        check=connection_alive,
+        **kwargs,
+    )
+
+
+def unix_pool(path: str, **kwargs: Any) -> ResourcePool[Connection]:
+    """Pool of `asyncio.open_unix_connection(path)`, `kwargs` of `ResourcePool`."""
+    return ResourcePool(
+        lambda: asyncio.open_unix_connection(path),
+        close_connection,
+        check=connection_alive,
+        **kwargs,
+    )
+
+
+async def echo(conn: Connection, data: bytes) -> bytes:
+    reader, writer = conn
+    writer.write(data)
+    await writer.drain()
+    return await reader.readexactly(len(data))
+
+
+async def handle_echo(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    try:
+        while data := await reader.read(4096):
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def bench(path: str, n: int = 20_000, concurrency: int = 50) -> None:
+    async with unix_pool(path, max_size=concurrency) as pool:
+
+        async def pooled(_: int) -> None:
+            async with pool.acquire() as conn:
+                await echo(conn, b'ping')
+
+        async def unpooled(_: int) -> None:
+            conn = await asyncio.open_unix_connection(path)
+            try:
+                await echo(conn, b'ping')
+            finally:
+                await close_connection(conn)
+
+        for name, func in (('new connection', unpooled), ('pooled', pooled)):
+            t0 = time.perf_counter()
+            async for _ in amap(func, range(n), concurrency=concurrency):
+                pass
+            elapsed = time.perf_counter() - t0
+            LOGGER.info(f'{name:>16}: {n / elapsed:>8,.0f} requests/s')
+        wait = pool.wait.snapshot()
+        LOGGER.info(
+            f'pool: created {pool.created}, '
+            f'wait p50 {wait.quantile(0.5) * 1e6:.0f} us, '
+            f'p99 {wait.quantile(0.99) * 1e6:.0f} us, '
+            f'utilisation {pool.utilisation:.2f}'
+        )
+
+
+async def main() -> None:
+    path = os.path.join(tempfile.mkdtemp(), 'echo.sock')
+    server = await asyncio.start_unix_server(handle_echo, path)
+    async with server:
+        async with unix_pool(path, max_size=2, max_idle=0.2, check_after=0.0) as pool:
+            # lazy creation, LIFO reuse
+            async with pool.acquire() as conn1:
+                async with pool.acquire() as conn2:
+                    assert pool.size == 2 and await echo(conn2, b'hi') == b'hi'
+            assert pool.created == 2
+            async with pool.acquire() as conn:
+                assert conn is conn1  # last returned
+
+            # max size: the third borrower waits
+            async def borrow(hold: float) -> None:
+                async with pool.acquire():
+                    await asyncio.sleep(hold)
+
+            await asyncio.gather(*(borrow(0.01) for _ in range(3)))
+            assert pool.created == 2 and pool.wait.snapshot().count == 6
+
+            # health check on borrow: peer closed the connection
+            async with pool.acquire() as conn:
+                assert conn is conn1
+                conn[1].write_eof()
+                await asyncio.sleep(0.01)  # server gets EOF, closes
+            async with pool.acquire() as conn:
+                assert conn is conn2 and pool.failed_checks == 1
+
+            # idle eviction
+            await asyncio.sleep(0.5)
+            assert pool.idle == 0 and pool.evicted == 1
+            snapshot = pool.snapshot()
+            LOGGER.info({k: v for k, v in snapshot.items() if 'seconds' not in k})
+
+        # the slot of a discarded resource goes to the first waiter (FIFO),
+        # not to a borrower arriving in between
+        async with unix_pool(path, max_size=1) as pool:
+            order: list[str] = []
+            tasks: list[asyncio.Task[None]] = []
+
+            async def borrow_as(name: str) -> None:
+                async with pool.acquire():
+                    order.append(name)
+                    await asyncio.sleep(0.01)
+                    if name == 'first':
+                        tasks.append(asyncio.create_task(borrow_as('late')))
+                        raise ConnectionError  # discarded
+
+            tasks.append(asyncio.create_task(borrow_as('first')))
+            await asyncio.sleep(0)
+            tasks.append(asyncio.create_task(borrow_as('waiter')))
+            await asyncio.sleep(0.05)
+            await asyncio.gather(*tasks, return_exceptions=True)
+            assert order == ['first', 'waiter', 'late'], order
+            assert pool.discarded == 1 and pool.created == 2
+
+        # a borrower cancelled during the health check does not leak the slot
+        async def slow_check(_: Connection) -> bool:
+            await asyncio.sleep(1)
+            return True
+
+        async with ResourcePool(
+            lambda: asyncio.open_unix_connection(path),
+            close_connection,
+            max_size=1,
+            check=slow_check,
+            check_after=0.0,
+            acquire_timeout=0.05,
+        ) as pool:
+            async with pool.acquire():  # new: not checked
+                pass
+            try:
+                async with pool.acquire():  # idle: checked, times out
+                    pass
+            except TimeoutError:
+                pass
+            assert pool.size == 0 and pool.timeouts == 1, pool
+            async with pool.acquire():  # not blocked by a leaked slot
+                assert pool.created == 2
+
+        await bench(path)
+    os.unlink(path)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.DEBUG, style='{', format='[{threadName} ({thread})] {message}'
+    )
+    asyncio.run(main())
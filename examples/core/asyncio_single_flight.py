@@ -0,0 +1,188 @@
+"""Asynchronous I/O - Single-flight: coalesce concurrent identical calls.
+
+Under load, many concurrent requests run the same query (e.g. cache miss of a hot
+key, *thundering herd*). With single-flight, the first caller of a key starts the
+call, and concurrent callers of the same key wait for its result instead of
+running their own:
+
+- one shared in-flight task per key, the key is forgotten when it completes,
+  so later callers start a fresh call (no caching of results);
+- each caller waits on it through `asyncio.shield()`: cancelling one caller
+  does not cancel the shared call while other callers still wait for it;
+  the last one to leave cancels it;
+- results and errors are shared by all callers of the call;
+- coalescing ratio: calls served by another caller's call.
+
+**NOTE**: The shared call runs in the context (`contextvars`) of the first caller,
+e.g. with its deadline.
+
+Run: `python -m examples.core.asyncio_single_flight`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, Generic, TypeVar
+
+K = TypeVar('K', bound=Hashable)
+R = TypeVar('R')
+
+LOGGER = logging.getLogger(__name__)
+
+
+class _Call(Generic[R]):
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: asyncio.Future[R]) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[K, R]):
+    """At most one in-flight call per key, shared by concurrent callers."""
+
+    def __init__(self) -> None:
+        self._calls: dict[K, _Call[R]] = {}
+        self.calls = 0
+        self.executions = 0
+
+    def __len__(self) -> int:
+        """In-flight calls."""
+        return len(self._calls)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._calls
+
+    @property
+    def coalesced(self) -> int:
+        return self.calls - self.executions
+
+    @property
+    def coalescing_ratio(self) -> float:
+        """Share of calls served by another caller's call."""
+        return self.coalesced / self.calls if self.calls else 0.0
+
+    async def do(self, key: K, fn: Callable[[], Awaitable[R]]) -> R:
+        """`await fn()`, or join the in-flight call of `key`."""
+        self.calls += 1
+        call = self._calls.get(key)
+        if call is None:
+            self.executions += 1
+            call = self._start(key, fn)
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # the last caller left (cancelled): nobody needs the result
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _start(self, key: K, fn: Callable[[], Awaitable[R]]) -> _Call[R]:
+        call = _Call(asyncio.ensure_future(fn()))
+        self._calls[key] = call
+
+        def done(_: asyncio.Future[R]) -> None:
+            self._forget(key, call)
+
+        call.task.add_done_callback(done)
+        return call
+
+    def forget(self, key: K) -> None:
+        """Later callers of `key` start a new call, current ones keep waiting."""
+        self._calls.pop(key, None)
+
+    def _forget(self, key: K, call: _Call[R]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'coalescing_ratio': self.coalescing_ratio,
+            'in_flight': len(self._calls),
+        }
+
+
+async def main() -> None:
+    flight: SingleFlight[str, int] = SingleFlight()
+    executions = 0
+
+    async def query(value: int, delay: float = 0.05) -> int:
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(delay)
+        return value
+
+    # 100 concurrent calls, 1 execution
+    results = await asyncio.gather(
+        *(flight.do('k', lambda: query(1)) for _ in range(100))
+    )
+    assert results == [1] * 100 and executions == 1 and not flight
+    # completed: the next call starts a new one
+    assert await flight.do('k', lambda: query(2)) == 2 and executions == 2
+
+    # cancelling one caller does not cancel the shared call
+    t1 = asyncio.create_task(flight.do('k', lambda: query(3)))
+    t2 = asyncio.create_task(flight.do('k', lambda: query(3)))
+    await asyncio.sleep(0.01)
+    t1.cancel()
+    assert await t2 == 3 and t1.cancelled()
+
+    # cancelling all callers cancels it
+    shared = asyncio.create_task(flight.do('k', lambda: query(4, 10)))
+    await asyncio.sleep(0.01)
+    assert 'k' in flight
+    shared.cancel()
+    await asyncio.gather(shared, return_exceptions=True)
+    assert 'k' not in flight
+
+    # errors are shared
+    async def fail() -> int:
+        await asyncio.sleep(0.01)
+        raise ConnectionError('down')
+
+    errors = await asyncio.gather(
+        *(flight.do('e', fail) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(e, ConnectionError) for e in errors)
+
+    # 2,000 requests over 50 ms, 10 hot keys, backend query of 20 ms
+    rng = random.Random(42)
+
+    async def request(key: str, flight: SingleFlight[str, int] | None) -> None:
+        await asyncio.sleep(rng.random() * 0.05)
+        if flight is not None:
+            await flight.do(key, lambda: query(0, 0.02))
+        else:
+            await query(0, 0.02)
+
+    for coalesce in (False, True):
+        flight = SingleFlight()
+        executions = 0
+        t0 = time.perf_counter()
+        keys = [f'key-{rng.randrange(10)}' for _ in range(2000)]
+        await asyncio.gather(
+            *(request(key, flight if coalesce else None) for key in keys)
+        )
+        elapsed = time.perf_counter() - t0
+        ratio = f', coalescing ratio {flight.coalescing_ratio:.3f}' if coalesce else ''
+        LOGGER.info(
+            f'single-flight={coalesce}: {executions} backend queries '
+            f'for 2000 requests in {elapsed:.3f} seconds{ratio}'
+        )
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.DEBUG, style='{', format='[{threadName} ({thread})] {message}'
+    )
+    asyncio.run(main())
@@ -0,0 +1,277 @@
+"""Asynchronous I/O - Synchronization Primitives: Reader-Writer Lock, Lock Striping.
+
+`asyncio.Lock` serialises everyone, readers included. For read-heavy shared
+state (e.g. in-process caches):
+
+- `RWLock`: many readers at a time, or one writer.
+  **Writer-preferring**: once a writer is waiting, new readers wait behind it,
+  so a steady stream of readers can not starve writers.
+- `StripedLock`: `N` locks, a key is hashed to one of them, for per-key locking
+  without a lock per key (memory bounded by `N`).
+
+Run: `python -m examples.core.asyncio_synchronization_rwlock`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from collections import deque
+from collections.abc import Callable, Hashable
+from types import TracebackType
+from typing import Any, Generic, TypeVar, overload
+
+logging.basicConfig(
+    level=logging.DEBUG, style='{', format='[{threadName} ({thread})] {message}'
+)
+
+L = TypeVar('L', asyncio.Lock, 'RWLock')
+
+
+class _Side:
+    """`async with lock.reader:` / `async with lock.writer:`."""
+
+    def __init__(self, rwlock: RWLock, write: bool) -> None:
+        self._rwlock = rwlock
+        self._write = write
+
+    async def __aenter__(self) -> None:
+        if self._write:
+            await self._rwlock.acquire_write()
+        else:
+            await self._rwlock.acquire_read()
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        # synchronous: can not be interrupted by cancellation or timeout
+        if self._write:
+            self._rwlock.release_write()
+        else:
+            self._rwlock.release_read()
+
+
+class RWLock:
+    """Writer-preferring reader-writer lock.
+
+    Like `asyncio.Lock`: waiters are futures in FIFO queues, `release_*()` is
+    synchronous and hands the lock over to the next waiters.
+    """
+
+    def __init__(self) -> None:
+        self._readers = 0
+        self._writer = False
+        self._read_waiters: deque[asyncio.Future[None]] = deque()
+        self._write_waiters: deque[asyncio.Future[None]] = deque()
+        self.reader = _Side(self, write=False)
+        self.writer = _Side(self, write=True)
+
+    def __repr__(self) -> str:
+        return (
+            f'<{type(self).__name__} readers={self._readers} writer={self._writer} '
+            f'waiting_writers={len(self._write_waiters)}>'
+        )
+
+    @property
+    def readers(self) -> int:
+        return self._readers
+
+    def locked(self) -> bool:
+        """Held by a writer."""
+        return self._writer
+
+    async def acquire_read(self) -> None:
+        if not self._writer and not self._write_waiters:
+            self._readers += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._read_waiters.append(fut)
+        try:
+            try:
+                await fut
+            finally:
+                self._read_waiters.remove(fut)
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release_read()  # granted, then cancelled: pass it on
+            raise
+
+    def release_read(self) -> None:
+        if self._readers <= 0:
+            raise RuntimeError('RWLock is not held for reading')
+        self._readers -= 1
+        if not self._readers:
+            self._wake()
+
+    async def acquire_write(self) -> None:
+        if not self._writer and not self._readers and not self._write_waiters:
+            self._writer = True
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._write_waiters.append(fut)
+        try:
+            try:
+                await fut
+            finally:
+                self._write_waiters.remove(fut)
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release_write()  # granted, then cancelled: pass it on
+            else:
+                self._wake()  # readers may be waiting for this writer only
+            raise
+
+    def release_write(self) -> None:
+        if not self._writer:
+            raise RuntimeError('RWLock is not held for writing')
+        self._writer = False
+        self._wake()
+
+    def _wake(self) -> None:
+        """Hand the lock over: to the first waiting writer, else to all readers."""
+        if self._writer:
+            return
+        for fut in self._write_waiters:
+            if not fut.done():
+                if not self._readers:
+                    fut.set_result(None)
+                    self._writer = True
+                return  # new readers wait behind a waiting writer
+        for fut in self._read_waiters:
+            if not fut.done():
+                fut.set_result(None)
+                self._readers += 1
+
+
+class StripedLock(Generic[L]):
+    """`stripes` locks, `lock[key]` is the lock of `key`.
+
+    Different keys may share a lock (false sharing), more stripes means less
+    contention; the same key always maps to the same lock.
+    """
+
+    @overload
+    def __init__(self: StripedLock[asyncio.Lock], stripes: int = 64) -> None: ...
+
+    @overload
+    def __init__(self, stripes: int, factory: Callable[[], L]) -> None: ...
+
+    def __init__(
+        self, stripes: int = 64, factory: Callable[[], Any] = asyncio.Lock
+    ) -> None:
+        if stripes < 1:
+            raise ValueError('stripes must be >= 1')
+        self._locks: list[L] = [factory() for _ in range(stripes)]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def __getitem__(self, key: Hashable) -> L:
+        return self._locks[hash(key) % len(self._locks)]
+
+
+async def bench(tasks: int = 200, ops: int = 50, write_ratio: float = 0.05) -> None:
+    """Each op holds the lock across an `await` (e.g. fetch on miss)."""
+    rng = random.Random(42)
+    workload = [
+        [(rng.random() < write_ratio, rng.randrange(1000)) for _ in range(ops)]
+        for _ in range(tasks)
+    ]
+    hold = 0.0005
+
+    async def run(name: str, section: Callable[[bool, int], object]) -> None:
+        async def worker(plan: list[tuple[bool, int]]) -> None:
+            for write, key in plan:
+                async with section(write, key):  # type: ignore[attr-defined]
+                    await asyncio.sleep(hold)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(plan) for plan in workload))
+        elapsed = time.perf_counter() - t0
+        logging.info(f'{name:>28}: {tasks * ops / elapsed:>10,.0f} ops/s')
+
+    lock = asyncio.Lock()
+    await run('global Lock', lambda write, key: lock)
+
+    rwlock = RWLock()
+    await run(
+        'global RWLock', lambda write, key: rwlock.writer if write else rwlock.reader
+    )
+
+    striped: StripedLock[asyncio.Lock] = StripedLock(64)
+    await run('StripedLock(64)', lambda write, key: striped[key])
+
+    striped_rw: StripedLock[RWLock] = StripedLock(64, RWLock)
+    await run(
+        'StripedLock(64, RWLock)',
+        lambda write, key: striped_rw[key].writer if write else striped_rw[key].reader,
+    )
+
+
+async def main() -> None:
+    rwlock = RWLock()
+    events: list[str] = []
+
+    async def reader(i: int, delay: float) -> None:
+        await asyncio.sleep(delay)
+        async with rwlock.reader:
+            events.append(f'r{i}+')
+            await asyncio.sleep(0.02)
+            events.append(f'r{i}-')
+
+    async def writer(delay: float) -> None:
+        await asyncio.sleep(delay)
+        async with rwlock.writer:
+            assert rwlock.locked() and not rwlock.readers
+            events.append('w+')
+            await asyncio.sleep(0.02)
+            events.append('w-')
+
+    # r0, r1 share the lock; w waits for them; r2 (after w) waits for w
+    await asyncio.gather(reader(0, 0), reader(1, 0), writer(0.005), reader(2, 0.01))
+    logging.debug(events)
+    assert events[:2] == ['r0+', 'r1+'] and events.index('w+') > events.index('r1-')
+    assert events.index('r2+') > events.index('w-')
+
+    # cancelled writer does not block readers forever
+    async with rwlock.reader:
+        waiting = asyncio.create_task(rwlock.acquire_write())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        async with asyncio.timeout(1):
+            async with rwlock.reader:
+                assert rwlock.readers == 2
+
+    # release is synchronous: a timeout (or cancellation) on exit does not leak it
+    async def hold_reader() -> None:
+        async with rwlock.reader:
+            await asyncio.sleep(1)
+
+    with contextlib.suppress(TimeoutError):
+        async with asyncio.timeout(0.01):
+            await hold_reader()
+    assert rwlock.readers == 0
+    async with asyncio.timeout(1):
+        async with rwlock.writer:
+            pass
+
+    # granted, then cancelled before it runs: the lock is passed on
+    async with rwlock.reader:
+        granted = asyncio.create_task(rwlock.acquire_write())
+        await asyncio.sleep(0)
+    granted.cancel()  # lock handed over on release, `granted` not resumed yet
+    await asyncio.gather(granted, return_exceptions=True)
+    assert not rwlock.locked() and not rwlock.readers
+
+    await bench()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,341 @@
+"""Asynchronous I/O - Hierarchical timing wheel for millions of timers.
+
+`loop.call_later()`/`loop.call_at()` keep every `TimerHandle` in the loop's heap:
+O(log n) insert, and cancelled handles stay in the heap until they reach the top
+(or until the loop compacts it).
+
+A hierarchical timing wheel on a single loop timer:
+
+- O(1) schedule and cancel: each slot is a `list` of handles, a handle knows
+  its slot and index in it, and is removed by swapping with the last one.
+  (A `set` per slot is O(1) too, but costs about 80 bytes per timer.)
+- Level `l` has `slots` slots of `tick * slots ** l` seconds each;
+  timers are cascaded down to lower levels as time goes on.
+  Timers beyond the top level wait in an overflow list.
+- Timers fire in ticks, i.e. up to `tick` seconds late, never early.
+- `call_later()`/`call_at()` compatible API, `WheelHandle.cancel()`.
+
+Run: `python -m examples.core.asyncio_timing_wheel`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import math
+import random
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+
+class WheelHandle:
+    """Like `asyncio.TimerHandle`."""
+
+    __slots__ = (
+        '_when',
+        '_callback',
+        '_args',
+        '_context',
+        '_wheel',
+        '_bucket',
+        '_index',
+    )
+
+    def __init__(
+        self,
+        when: float,
+        callback: Callable[..., object],
+        args: tuple[Any, ...],
+        context: contextvars.Context,
+        wheel: TimingWheel,
+    ) -> None:
+        self._when = when
+        self._callback = callback
+        self._args = args
+        self._context = context
+        self._wheel: TimingWheel | None = wheel
+        self._bucket: list[WheelHandle] | None = None
+        self._index = 0
+
+    def when(self) -> float:
+        return self._when
+
+    def cancel(self) -> None:
+        if self._wheel is not None:
+            self._wheel._remove(self)  # pylint: disable=protected-access
+            self._wheel = None
+            self._callback = None  # type: ignore[assignment]
+            self._args = ()
+
+    def cancelled(self) -> bool:
+        return self._wheel is None and self._callback is None
+
+
+class TimingWheel:  # pylint: disable=protected-access,too-many-instance-attributes
+    """Hierarchical timing wheel, on a single `loop.call_at()` timer.
+
+    :param `tick`: resolution, in seconds
+    :param `slots`: slots per level
+    :param `levels`: number of levels, covering `tick * slots ** levels` seconds
+    """
+
+    def __init__(
+        self,
+        tick: float = 0.01,
+        slots: int = 256,
+        levels: int = 4,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ) -> None:
+        self._loop = loop or asyncio.get_running_loop()
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._spans = [slots**level for level in range(levels + 1)]  # in ticks
+        self._wheels: list[list[list[WheelHandle]]] = [
+            [[] for _ in range(slots)] for _ in range(levels)
+        ]
+        self._overflow: list[WheelHandle] = []
+        self._origin = self._loop.time()
+        self._now = 0  # current tick, all timers of it have fired
+        self._count = 0
+        self._timer: asyncio.TimerHandle | None = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def call_at(
+        self,
+        when: float,
+        callback: Callable[..., object],
+        *args: Any,
+        context: contextvars.Context | None = None,
+    ) -> WheelHandle:
+        if not self._count:
+            # idle: no timers to cascade, jump to current time
+            self._now = int((self._loop.time() - self._origin) / self.tick)
+        handle = WheelHandle(
+            when,
+            callback,
+            args,
+            context if context is not None else contextvars.copy_context(),
+            self,
+        )
+        self._insert(handle)
+        self._count += 1
+        if self._timer is None:
+            self._arm()
+        return handle
+
+    def call_later(
+        self,
+        delay: float,
+        callback: Callable[..., object],
+        *args: Any,
+        context: contextvars.Context | None = None,
+    ) -> WheelHandle:
+        return self.call_at(self._loop.time() + delay, callback, *args, context=context)
+
+    def _insert(self, handle: WheelHandle, earliest: int = 1) -> None:
+        """Insert into its slot, `earliest` ticks from now at the earliest.
+
+        New timers: 1, all timers of the current tick have fired.
+        Cascaded timers: 0, level 0 of the current tick fires after cascading.
+        """
+        expiry = math.ceil((handle._when - self._origin) / self.tick)
+        delta = expiry - self._now
+        if delta < earliest:
+            expiry = self._now + earliest  # already due
+            delta = earliest
+        spans = self._spans
+        for level in range(self.levels):
+            if delta < spans[level + 1]:
+                bucket = self._wheels[level][(expiry // spans[level]) % self.slots]
+                break
+        else:
+            bucket = self._overflow
+        handle._index = len(bucket)
+        handle._bucket = bucket
+        bucket.append(handle)
+
+    def _remove(self, handle: WheelHandle) -> None:
+        bucket = handle._bucket
+        if bucket is not None:
+            # swap with the last one, then pop: O(1)
+            last = bucket.pop()
+            if last is not handle:
+                bucket[handle._index] = last
+                last._index = handle._index
+            handle._bucket = None
+            self._count -= 1
+            if not self._count and self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _arm(self) -> None:
+        self._timer = self._loop.call_at(
+            self._origin + (self._now + 1) * self.tick, self._run
+        )
+
+    def _run(self) -> None:
+        self._timer = None
+        target = int((self._loop.time() - self._origin) / self.tick)
+        while self._now < target and self._count:
+            self._advance()
+        if self._count and self._timer is None:  # may be armed by a callback
+            self._arm()
+
+    def _advance(self) -> None:
+        """Move to the next tick: cascade higher levels, then fire level 0."""
+        self._now += 1
+        now = self._now
+        spans = self._spans
+        for level in range(1, self.levels):
+            if now % spans[level]:
+                break
+            wheel = self._wheels[level]
+            index = (now // spans[level]) % self.slots
+            bucket, wheel[index] = wheel[index], []
+            for handle in bucket:
+                self._insert(handle, 0)
+        else:
+            if not now % spans[self.levels]:
+                bucket, self._overflow = self._overflow, []
+                for handle in bucket:
+                    self._insert(handle, 0)
+
+        wheel = self._wheels[0]
+        index = now % self.slots
+        bucket, wheel[index] = wheel[index], []
+        self._count -= len(bucket)
+        # detach all first: a callback may cancel another handle of this bucket
+        for handle in bucket:
+            handle._bucket = None
+        for handle in bucket:
+            if handle._wheel is None:  # cancelled by an earlier callback
+                continue
+            handle._wheel = None
+            try:
+                handle._context.run(handle._callback, *handle._args)
+            except (SystemExit, KeyboardInterrupt):
+                raise
+            except BaseException as exc:  # pylint: disable=broad-exception-caught
+                self._loop.call_exception_handler(
+                    {
+                        'message': f'Exception in callback {handle._callback!r}',
+                        'exception': exc,
+                        'handle': handle,
+                    }
+                )
+
+    def close(self) -> None:
+        """Cancel all timers."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for wheel in self._wheels:
+            for bucket in wheel:
+                bucket.clear()
+        self._overflow.clear()
+        self._count = 0
+
+
+async def bench(n: int) -> None:
+    loop = asyncio.get_running_loop()
+    delays = [random.uniform(10, 60) for _ in range(n)]
+
+    def noop() -> None:
+        pass
+
+    # schedule + cancel, e.g. per-session idle timeouts reset by activity
+    for name in ('loop.call_later', 'TimingWheel.call_later'):
+        result: list[str] = []
+        for trace in (False, True):
+            wheel = TimingWheel(tick=0.01)
+            call_later = (
+                loop.call_later if name == 'loop.call_later' else wheel.call_later
+            )
+
+            if trace:
+                tracemalloc.start()
+            t0 = time.perf_counter()
+            handles = [call_later(d, noop) for d in delays]
+            elapsed = time.perf_counter() - t0
+            if trace:
+                current, _ = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                result.append(f'memory {current / 1024 / 1024:>6.1f} MiB')
+            else:
+                result.append(f'schedule {n / elapsed:>10,.0f} /s')
+
+            t0 = time.perf_counter()
+            for h in handles:
+                h.cancel()
+            if not trace:
+                result.append(f'cancel {n / (time.perf_counter() - t0):>10,.0f} /s')
+            del handles
+            await asyncio.sleep(0)  # let the loop drop cancelled handles
+            wheel.close()
+        print(f'{name:>24}: ' + ', '.join(result))
+
+    # fire: n timers within 1 second
+    fired = 0
+
+    def count() -> None:
+        nonlocal fired
+        fired += 1
+
+    for name in ('loop.call_later', 'TimingWheel.call_later'):
+        fired = 0
+        wheel = TimingWheel(tick=0.01)
+        call_later = loop.call_later if name == 'loop.call_later' else wheel.call_later
+        t0 = time.perf_counter()
+        for d in delays:
+            call_later(d / 60, count)
+        while fired < n:
+            await asyncio.sleep(0.1)
+        print(f'{name:>24}: fire {n} timers in {time.perf_counter() - t0:.2f} seconds')
+
+
+async def main() -> None:
+    loop = asyncio.get_running_loop()
+    wheel = TimingWheel(tick=0.01, slots=4, levels=2)  # small, to cascade
+
+    fired: list[tuple[int, float]] = []
+    start = loop.time()
+    for i in range(1, 6):
+        wheel.call_later(i * 0.05, lambda i=i: fired.append((i, loop.time() - start)))
+    wheel.call_later(0.3, lambda: fired.append((6, loop.time() - start)))  # overflow
+    cancelled = wheel.call_later(0.1, fired.append, (0, 0.0))
+    cancelled.cancel()
+    assert cancelled.cancelled()
+
+    await asyncio.sleep(0.4)
+    assert [i for i, _ in fired] == [1, 2, 3, 4, 5, 6], fired
+    for i, elapsed in fired:
+        assert i * 0.05 <= elapsed < i * 0.05 + 0.05, (i, elapsed)
+    assert not wheel
+
+    # a callback cancelling a later timer of the same tick
+    fired.clear()
+    when = loop.time() + 0.05
+    handles: list[WheelHandle] = []
+
+    def fire_and_cancel() -> None:
+        fired.append((1, 0.0))
+        handles[1].cancel()
+
+    handles.append(wheel.call_at(when, fire_and_cancel))
+    handles.append(wheel.call_at(when, fired.append, (2, 0.0)))
+    wheel.call_later(0.2, fired.append, (3, 0.0))
+    await asyncio.sleep(0.3)
+    assert [i for i, _ in fired] == [1, 3], fired
+    assert handles[1].cancelled()
+    assert not wheel
+
+    await bench(1_000_000)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
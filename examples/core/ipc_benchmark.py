@@ -0,0 +1,412 @@
+"""IPC - Transport Benchmark
+
+Round-trip latency and one-way throughput of IPC transports between a parent
+and a child process, for message sizes from 64 B to 16 MiB:
+
+- `socketpair`: `socket.socketpair()` (`AF_UNIX`, `SOCK_STREAM`)
+- `uds_stream`: UNIX domain socket (UDS), `SOCK_STREAM`, bound to a path
+- `uds_dgram`: UDS, `SOCK_DGRAM`
+- `uds_seqpacket`: UDS, `SOCK_SEQPACKET`
+- `pipe`: `os.pipe()`
+- `mp_queue`: `multiprocessing.Queue`
+- `mp_pipe`: `multiprocessing.Pipe`
+- `shm`: `multiprocessing.shared_memory`, with a socket pair as doorbell
+
+Results are written as JSON Lines, one object per (transport, size, mode).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Any, Protocol
+
+KIB = 1024
+MIB = 1024 * KIB
+
+# Endpoints (pipes, file objects) are inherited by the child, not pickled.
+mp = multiprocessing.get_context('fork')
+
+# 64 B, 256 B, 1 KiB, ... 16 MiB
+DEFAULT_SIZES = tuple(64 * 4**i for i in range(10))
+
+
+class Endpoint(Protocol):
+    """One end of a transport.
+
+    Both ends know the message size, so no framing is needed.
+    """
+
+    def send(self, data: memoryview) -> None: ...
+
+    def recv_into(self, buf: memoryview) -> None:
+        """Receive exactly one message of `len(buf)` bytes."""
+
+    def close(self) -> None: ...
+
+
+class StreamSocketEndpoint:
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+
+    def send(self, data: memoryview) -> None:
+        self.sock.sendall(data)
+
+    def recv_into(self, buf: memoryview) -> None:
+        got = 0
+        while got < len(buf):
+            n = self.sock.recv_into(buf[got:])
+            if not n:
+                raise EOFError
+            got += n
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+class PacketSocketEndpoint(StreamSocketEndpoint):
+    """`SOCK_DGRAM` and `SOCK_SEQPACKET`: one message per datagram."""
+
+    def send(self, data: memoryview) -> None:
+        self.sock.send(data)
+
+    def recv_into(self, buf: memoryview) -> None:
+        if self.sock.recv_into(buf) != len(buf):
+            raise EOFError
+
+
+class PipeEndpoint:
+    def __init__(self, rfd: int, wfd: int) -> None:
+        self.rfile = open(rfd, 'rb', buffering=0)  # pylint: disable=R1732
+        self.wfile = open(wfd, 'wb', buffering=0)  # pylint: disable=R1732
+
+    def send(self, data: memoryview) -> None:
+        sent = 0
+        while sent < len(data):
+            sent += self.wfile.write(data[sent:]) or 0
+
+    def recv_into(self, buf: memoryview) -> None:
+        got = 0
+        while got < len(buf):
+            n = self.rfile.readinto(buf[got:])
+            if not n:
+                raise EOFError
+            got += n
+
+    def close(self) -> None:
+        self.rfile.close()
+        self.wfile.close()
+
+
+class QueueEndpoint:
+    def __init__(self, rq: Any, wq: Any) -> None:
+        self.rq = rq
+        self.wq = wq
+
+    def send(self, data: memoryview) -> None:
+        self.wq.put(data.tobytes())
+
+    def recv_into(self, buf: memoryview) -> None:
+        buf[:] = self.rq.get()
+
+    def close(self) -> None:
+        self.wq.close()
+
+
+class ConnectionEndpoint:
+    def __init__(self, conn: Connection) -> None:
+        self.conn = conn
+
+    def send(self, data: memoryview) -> None:
+        self.conn.send_bytes(data)
+
+    def recv_into(self, buf: memoryview) -> None:
+        self.conn.recv_bytes_into(buf)
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class SharedMemoryEndpoint:  # pylint: disable=too-many-instance-attributes
+    """Ring of `slots` message slots per direction in shared memory.
+
+    A socket pair per direction carries 1-byte "full" notifications
+    (sender -> receiver) and 1-byte "free" credits (receiver -> sender).
+    """
+
+    def __init__(
+        self,
+        tx: tuple[SharedMemory, socket.socket],
+        rx: tuple[SharedMemory, socket.socket],
+        size: int,
+        slots: int,
+    ) -> None:
+        self.tx_shm, self.tx_bell = tx
+        self.rx_shm, self.rx_bell = rx
+        self.size = size
+        self.slots = slots
+        self.credits = slots
+        self.tx_seq = 0
+        self.rx_seq = 0
+
+    def _slot(self, mem: SharedMemory, seq: int) -> memoryview:
+        assert mem.buf is not None
+        offset = (seq % self.slots) * self.size
+        return mem.buf[offset : offset + self.size]
+
+    def send(self, data: memoryview) -> None:
+        if not self.credits:
+            self.credits += len(self.tx_bell.recv(self.slots))
+        self.credits -= 1
+        with self._slot(self.tx_shm, self.tx_seq) as slot:
+            slot[:] = data
+        self.tx_seq += 1
+        self.tx_bell.sendall(b'F')
+
+    def recv_into(self, buf: memoryview) -> None:
+        if not self.rx_bell.recv(1):
+            raise EOFError
+        with self._slot(self.rx_shm, self.rx_seq) as slot:
+            buf[:] = slot
+        self.rx_seq += 1
+        self.rx_bell.sendall(b'C')
+
+    def close(self) -> None:
+        self.tx_bell.close()
+        self.rx_bell.close()
+        self.tx_shm.close()
+        self.rx_shm.close()
+
+
+def _tune_packet_socket(sock: socket.socket, size: int) -> None:
+    # Clamped by `/proc/sys/net/core/{w,r}mem_max` on Linux.
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, max(size * 2, 64 * KIB))
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, max(size * 2, 64 * KIB))
+
+
+@contextmanager
+def socketpair(_size: int) -> Iterator[tuple[Endpoint, Endpoint]]:
+    a, b = socket.socketpair()
+    yield StreamSocketEndpoint(a), StreamSocketEndpoint(b)
+
+
+@contextmanager
+def uds_stream(_size: int) -> Iterator[tuple[Endpoint, Endpoint]]:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sockfile = str(Path(tmpdir) / 'bench.sock')
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+            listener.bind(sockfile)
+            listener.listen(1)
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client.connect(sockfile)
+            conn, _ = listener.accept()
+        yield StreamSocketEndpoint(client), StreamSocketEndpoint(conn)
+
+
+@contextmanager
+def uds_packet(size: int, kind: int) -> Iterator[tuple[Endpoint, Endpoint]]:
+    a, b = socket.socketpair(socket.AF_UNIX, kind)
+    for sock in (a, b):
+        _tune_packet_socket(sock, size)
+    yield PacketSocketEndpoint(a), PacketSocketEndpoint(b)
+
+
+@contextmanager
+def uds_dgram(size: int) -> Iterator[tuple[Endpoint, Endpoint]]:
+    with uds_packet(size, socket.SOCK_DGRAM) as pair:
+        yield pair
+
+
+@contextmanager
+def uds_seqpacket(size: int) -> Iterator[tuple[Endpoint, Endpoint]]:
+    with uds_packet(size, socket.SOCK_SEQPACKET) as pair:
+        yield pair
+
+
+@contextmanager
+def pipe(_size: int) -> Iterator[tuple[Endpoint, Endpoint]]:
+    r1, w1 = os.pipe()
+    r2, w2 = os.pipe()
+    yield PipeEndpoint(r1, w2), PipeEndpoint(r2, w1)
+
+
+@contextmanager
+def mp_queue(_size: int) -> Iterator[tuple[Endpoint, Endpoint]]:
+    q1: Any = mp.Queue()
+    q2: Any = mp.Queue()
+    yield QueueEndpoint(q1, q2), QueueEndpoint(q2, q1)
+
+
+@contextmanager
+def mp_pipe(_size: int) -> Iterator[tuple[Endpoint, Endpoint]]:
+    a, b = mp.Pipe()
+    yield ConnectionEndpoint(a), ConnectionEndpoint(b)
+
+
+@contextmanager
+def shm(size: int, slots: int = 4) -> Iterator[tuple[Endpoint, Endpoint]]:
+    shm1 = SharedMemory(create=True, size=size * slots)
+    shm2 = SharedMemory(create=True, size=size * slots)
+    a1, b1 = socket.socketpair()  # a -> b
+    a2, b2 = socket.socketpair()  # b -> a
+    try:
+        yield (
+            SharedMemoryEndpoint((shm1, a1), (shm2, a2), size, slots),
+            SharedMemoryEndpoint((shm2, b2), (shm1, b1), size, slots),
+        )
+    finally:
+        shm1.unlink()
+        shm2.unlink()
+
+
+TransportFactory = Callable[[int], AbstractContextManager[tuple[Endpoint, Endpoint]]]
+
+TRANSPORTS: dict[str, TransportFactory] = {
+    'socketpair': socketpair,
+    'uds_stream': uds_stream,
+    'uds_dgram': uds_dgram,
+    'uds_seqpacket': uds_seqpacket,
+    'pipe': pipe,
+    'mp_queue': mp_queue,
+    'mp_pipe': mp_pipe,
+    'shm': shm,
+}
+
+
+def probe(name: str, size: int) -> str | None:
+    """Return the reason why `size` is not supported by the transport."""
+    if name not in ('uds_dgram', 'uds_seqpacket'):
+        return None
+    with TRANSPORTS[name](size) as (a, b):
+        try:
+            a.send(memoryview(bytes(size)))
+            b.recv_into(memoryview(bytearray(size)))
+        except OSError as err:
+            return os.strerror(err.errno) if err.errno else str(err)
+        finally:
+            a.close()
+            b.close()
+    return None
+
+
+def serve(endpoint: Endpoint, mode: str, size: int, count: int) -> None:
+    """Child process."""
+    buf = memoryview(bytearray(size))
+    if mode == 'latency':
+        for _ in range(count):
+            endpoint.recv_into(buf)
+            endpoint.send(buf)
+    else:
+        for _ in range(count):
+            endpoint.recv_into(buf)
+        endpoint.send(buf)  # ack
+    endpoint.close()
+
+
+def run_one(name: str, mode: str, size: int, count: int) -> dict[str, Any]:
+    msg = memoryview(os.urandom(size))
+    buf = memoryview(bytearray(size))
+    with TRANSPORTS[name](size) as (a, b):
+        child = mp.Process(target=serve, args=(b, mode, size, count))
+        child.start()
+        try:
+            if mode == 'latency':
+                rtts: list[float] = []
+                for _ in range(count):
+                    t0 = time.perf_counter_ns()
+                    a.send(msg)
+                    a.recv_into(buf)
+                    rtts.append((time.perf_counter_ns() - t0) / 1000)
+                quantiles = statistics.quantiles(rtts, n=100, method='inclusive')
+                result = {
+                    'rtt_us_mean': statistics.fmean(rtts),
+                    'rtt_us_p50': quantiles[49],
+                    'rtt_us_p99': quantiles[98],
+                }
+            else:
+                t0 = time.perf_counter_ns()
+                for _ in range(count):
+                    a.send(msg)
+                a.recv_into(buf)
+                elapsed = (time.perf_counter_ns() - t0) / 1e9
+                result = {
+                    'msgs_per_sec': count / elapsed,
+                    'mib_per_sec': count * size / MIB / elapsed,
+                }
+        finally:
+            child.join()
+            a.close()
+            b.close()
+    return {'transport': name, 'mode': mode, 'size': size, 'count': count} | result
+
+
+def counts(size: int, budget: int) -> dict[str, int]:
+    """Number of messages per run, so each run moves about `budget` bytes."""
+    return {
+        'latency': max(16, min(10_000, budget // size)),
+        'throughput': max(16, min(100_000, budget // size)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '-t',
+        '--transport',
+        action='append',
+        choices=TRANSPORTS,
+        help='transport to benchmark (repeatable, default: all)',
+    )
+    parser.add_argument(
+        '-s',
+        '--size',
+        action='append',
+        type=int,
+        help='message size in bytes (repeatable, default: 64 B ... 16 MiB)',
+    )
+    parser.add_argument(
+        '--budget',
+        type=int,
+        default=64 * MIB,
+        help='bytes to move per run (default: 64 MiB)',
+    )
+    parser.add_argument(
+        '-o',
+        '--output',
+        type=argparse.FileType('w', encoding='utf-8'),
+        default=sys.stdout,
+        help='JSON Lines output (default: stdout)',
+    )
+    args = parser.parse_args()
+
+    for name in args.transport or TRANSPORTS:
+        for size in args.size or DEFAULT_SIZES:
+            reason = probe(name, size)
+            for mode, count in counts(size, args.budget).items():
+                if reason:
+                    record: dict[str, Any] = {
+                        'transport': name,
+                        'mode': mode,
+                        'size': size,
+                        'skipped': reason,
+                    }
+                else:
+                    record = run_one(name, mode, size, count)
+                args.output.write(json.dumps(record) + '\n')
+                args.output.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""IPC - Pass accepted connections to worker processes (`SCM_RIGHTS`)
+
+One acceptor process accepts TCP or UNIX domain socket (UDS) connections,
+and hands each connection's file descriptor to the least-loaded worker
+process over a UDS socket pair, via `socket.send_fds()`/`socket.recv_fds()`.
+
+Unlike `SO_REUSEPORT`, where the kernel picks a listener by hashing the
+4-tuple, the acceptor balances by the actual number of connections each
+worker is serving.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import selectors
+import signal
+import socket
+from contextlib import suppress
+from dataclasses import dataclass
+
+logging.basicConfig(
+    level=logging.DEBUG, style='{', format='[{processName} ({process})] {message}'
+)
+logger = logging.getLogger()
+
+SOCKFILE = 'xxx.sock'
+
+# Control messages over the acceptor <-> worker channel.
+# One `SOCK_SEQPACKET` message per connection, so message boundaries
+# (and the ancillary data attached to them) are preserved.
+MSG_CONN = b'C'  # acceptor -> worker: a new connection (with 1 fd)
+MSG_DONE = b'D'  # worker -> acceptor: a connection has been closed
+
+
+@dataclass
+class Worker:
+    process: multiprocessing.Process
+    channel: socket.socket
+    load: int = 0  # connections currently served by the worker
+
+
+def worker_main(
+    channel: socket.socket, inherited: list[socket.socket], bufsize: int = 1024
+) -> None:
+    """Serve connections received from the acceptor (echo)."""
+    # Ctrl-C is handled by the acceptor, which closes the channel.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Acceptor ends of other workers' channels, inherited by `fork()`.
+    # Keeping them open would hide EOF from those workers on shutdown.
+    for sock in inherited:
+        sock.close()
+
+    sel = selectors.DefaultSelector()
+    sel.register(channel, selectors.EVENT_READ)
+
+    try:
+        while True:
+            for key, _ in sel.select():
+                if key.fileobj is channel:
+                    msg, fds, _, _ = socket.recv_fds(channel, len(MSG_CONN), 1)
+                    if not msg:
+                        logger.debug('acceptor gone, exit')
+                        return
+                    for fd in fds:
+                        sel.register(socket.socket(fileno=fd), selectors.EVENT_READ)
+                        logger.debug(f'got connection (fd={fd})')
+                    continue
+
+                conn = key.fileobj
+                assert isinstance(conn, socket.socket)
+                try:
+                    data: bytes = conn.recv(bufsize)
+                    if data:
+                        conn.sendall(data)
+                        logger.debug(f'echo: {data!r}')
+                        continue
+                except OSError as err:
+                    logger.warning(err)
+                sel.unregister(conn)
+                conn.close()
+                channel.sendall(MSG_DONE)
+    finally:
+        for key in list(sel.get_map().values()):
+            key.fileobj.close()  # type: ignore[union-attr]
+        sel.close()
+
+
+def create_listener(address: str | tuple[str, int]) -> socket.socket:
+    """Create TCP listener for `(host, port)`, or UDS listener for a path."""
+    if isinstance(address, str):
+        # Make sure the socket does not already exist.
+        with suppress(FileNotFoundError):
+            os.remove(address)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(address)
+    sock.listen()
+    return sock
+
+
+def start_workers(num: int) -> list[Worker]:
+    workers: list[Worker] = []
+    for i in range(num):
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        process = multiprocessing.Process(
+            target=worker_main,
+            args=(child, [parent] + [w.channel for w in workers]),
+            name=f'worker-{i}',
+            daemon=True,
+        )
+        process.start()
+        child.close()
+        workers.append(Worker(process, parent))
+    return workers
+
+
+def dispatch(conn: socket.socket, workers: list[Worker]) -> Worker:
+    """Pass `conn` to the least-loaded worker."""
+    worker = min(workers, key=lambda w: w.load)
+    socket.send_fds(worker.channel, [MSG_CONN], [conn.fileno()])
+    worker.load += 1
+
+    # The worker owns a duplicate of the descriptor now.
+    conn.close()
+    return worker
+
+
+def run_server(address: str | tuple[str, int], num_workers: int) -> None:
+    workers = start_workers(num_workers)
+    listener = create_listener(address)
+
+    sel = selectors.DefaultSelector()
+    sel.register(listener, selectors.EVENT_READ)
+    for worker in workers:
+        sel.register(worker.channel, selectors.EVENT_READ, worker)
+
+    logger.debug(f'accepting on {listener.getsockname()!r}')
+    try:
+        while True:
+            for key, _ in sel.select():
+                if key.fileobj is listener:
+                    conn, client_address = listener.accept()
+                    worker = dispatch(conn, workers)
+                    logger.debug(
+                        f'{client_address!r} -> {worker.process.name} '
+                        f'(load: {[w.load for w in workers]})'
+                    )
+                else:
+                    worker = key.data
+                    assert isinstance(worker, Worker)
+                    msg: bytes = worker.channel.recv(len(MSG_DONE))
+                    if not msg:
+                        raise RuntimeError(f'{worker.process.name} died')
+                    worker.load -= 1
+    finally:
+        sel.close()
+        listener.close()
+        if isinstance(address, str):
+            with suppress(FileNotFoundError):
+                os.remove(address)
+
+        # Closing the channel tells the worker to exit.
+        for worker in workers:
+            worker.channel.close()
+        for worker in workers:
+            worker.process.join()
+
+
+if __name__ == '__main__':
+    # UDS: `SOCKFILE`, TCP: `('localhost', 9999)`
+    run_server(SOCKFILE, num_workers=os.cpu_count() or 1)
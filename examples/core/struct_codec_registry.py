@@ -0,0 +1,256 @@
+"""Pack binary data - precompiled `Struct` registry and reusable send buffers.
+
+- Each format is compiled into a `struct.Struct` object once, and cached.
+- A batch of messages is packed with `Struct.pack_into()` into a pooled,
+  growable `bytearray`, then sent with `sendall()`/`sendmsg()` as a
+  `memoryview`, so no `bytes` object is allocated per message.
+- Messages are packed `BATCH_SIZE` at a time by one `Struct` of the format
+  repeated `BATCH_SIZE` times, i.e. one C call per chunk instead of per message.
+"""
+
+from __future__ import annotations
+
+import socket
+import struct
+import threading
+import time
+import tracemalloc
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Any
+
+KIB = 1024
+
+BATCH_SIZE = 256
+
+
+@lru_cache(maxsize=256)
+def batch_struct(fmt: str, count: int) -> struct.Struct | None:
+    """`count` records of `fmt` as one `Struct`.
+
+    `None` if native alignment (`'@'`) would insert padding between records.
+    """
+    if fmt and fmt[0] in '@=<>!':
+        order, body = fmt[0], fmt[1:]
+    else:
+        order, body = '@', fmt
+    s = struct.Struct(order + body * count)
+    return s if s.size == struct.calcsize(fmt) * count else None
+
+
+class StructRegistry:
+    """Named message formats, compiled once."""
+
+    def __init__(self) -> None:
+        self._structs: dict[str, struct.Struct] = {}
+        self._names: dict[str, struct.Struct] = {}
+
+    def get(self, fmt: str) -> struct.Struct:
+        try:
+            return self._structs[fmt]
+        except KeyError:
+            s = self._structs[fmt] = struct.Struct(fmt)
+            return s
+
+    def register(self, name: str, fmt: str) -> struct.Struct:
+        s = self._names[name] = self.get(fmt)
+        return s
+
+    def __getitem__(self, name: str) -> struct.Struct:
+        return self._names[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._names
+
+
+class SendBuffer:
+    """Growable `bytearray`, reused across sends.
+
+    **NOTE**: A `bytearray` can not be resized while a `memoryview` of it is
+    alive, so release views (e.g. `with buf.view() as view:`) before packing
+    more data.
+    """
+
+    def __init__(self, size: int = 64 * KIB) -> None:
+        self._buf = bytearray(size)
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    def _reserve(self, size: int) -> int:
+        offset = self._len
+        end = offset + size
+        if end > len(self._buf):
+            # grow by doubling: amortized O(1) per message
+            self._buf.extend(bytes(max(end, len(self._buf) * 2) - len(self._buf)))
+        self._len = end
+        return offset
+
+    def pack(self, s: struct.Struct, *values: Any) -> None:
+        s.pack_into(self._buf, self._reserve(s.size), *values)
+
+    def pack_many(self, s: struct.Struct, records: Sequence[tuple[Any, ...]]) -> None:
+        size = s.size
+        offset = self._reserve(size * len(records))
+        buf = self._buf
+
+        start = 0
+        batch = batch_struct(s.format, BATCH_SIZE)
+        if batch is not None:
+            start = len(records) - len(records) % BATCH_SIZE
+            for i in range(0, start, BATCH_SIZE):
+                batch.pack_into(
+                    buf, offset, *chain.from_iterable(records[i : i + BATCH_SIZE])
+                )
+                offset += batch.size
+
+        pack_into = s.pack_into
+        for values in islice(records, start, None):
+            pack_into(buf, offset, *values)
+            offset += size
+
+    def view(self) -> memoryview:
+        return memoryview(self._buf)[: self._len]
+
+    def clear(self) -> None:
+        self._len = 0
+
+    def sendall(self, sock: socket.socket) -> None:
+        with self.view() as view:
+            sock.sendall(view)
+        self.clear()
+
+    def sendmsg(self, sock: socket.socket, *, header: bytes = b'') -> None:
+        """Send `header` (if any) and the buffer in one `sendmsg()` (gather write)."""
+        with self.view() as view:
+            buffers = [memoryview(header), view] if header else [view]
+            while buffers:
+                sent = sock.sendmsg(buffers)
+                while buffers and sent >= len(buffers[0]):
+                    sent -= len(buffers.pop(0))
+                if sent:
+                    buffers[0] = buffers[0][sent:]
+        self.clear()
+
+
+class BufferPool:
+    """Pool of `SendBuffer`, LIFO reuse (the most recently used one is warm)."""
+
+    def __init__(
+        self,
+        size: int = 64 * KIB,
+        max_buffers: int = 16,
+        max_keep_size: int = 16 * 1024 * KIB,
+    ) -> None:
+        self.size = size
+        self.max_buffers = max_buffers
+        self.max_keep_size = max_keep_size  # do not keep larger buffers
+        self._free: list[SendBuffer] = []
+
+    @contextmanager
+    def buffer(self) -> Iterator[SendBuffer]:
+        buf = self._free.pop() if self._free else SendBuffer(self.size)
+        try:
+            yield buf
+        finally:
+            buf.clear()
+            if (
+                len(self._free) < self.max_buffers
+                and buf.capacity <= self.max_keep_size
+            ):
+                self._free.append(buf)
+
+
+REGISTRY = StructRegistry()
+POOL = BufferPool()
+
+
+def send_batch(
+    sock: socket.socket,
+    name: str,
+    records: Sequence[tuple[Any, ...]],
+    *,
+    registry: StructRegistry = REGISTRY,
+    pool: BufferPool = POOL,
+) -> None:
+    """Pack `records` of message type `name` into one buffer, and send it."""
+    with pool.buffer() as buf:
+        buf.pack_many(registry[name], records)
+        buf.sendall(sock)
+
+
+def main() -> None:
+    # Same format as `BinHandler`
+    REGISTRY.register('bin', '! I 2s Q 2h f')
+    value = (1, b'ab', 2, 3, 3, 2.5)
+
+    bin_struct = REGISTRY['bin']
+    assert REGISTRY.get('! I 2s Q 2h f') is bin_struct
+    with POOL.buffer() as buf:
+        buf.pack(bin_struct, *value)
+        buf.pack_many(bin_struct, [value] * (BATCH_SIZE + 1))
+        with buf.view() as v:
+            assert v == bin_struct.pack(*value) * (BATCH_SIZE + 2)
+    assert batch_struct('@ i b', 2) is None  # padding between records
+
+    n = 200_000
+    batch = [value] * 1000
+
+    def drain(sock: socket.socket) -> None:
+        sink = bytearray(256 * KIB)
+        while sock.recv_into(sink):
+            pass
+
+    def per_message_pack(sock: socket.socket) -> None:
+        for _ in range(n // len(batch)):
+            sock.sendall(b''.join(struct.pack('! I 2s Q 2h f', *r) for r in batch))
+
+    def precompiled_pack(sock: socket.socket) -> None:
+        for _ in range(n // len(batch)):
+            sock.sendall(b''.join(bin_struct.pack(*r) for r in batch))
+
+    def pooled_pack_into(sock: socket.socket) -> None:
+        for _ in range(n // len(batch)):
+            send_batch(sock, 'bin', batch)
+
+    def pooled_sendmsg(sock: socket.socket) -> None:
+        header = struct.pack('!I', len(batch))
+        for _ in range(n // len(batch)):
+            with POOL.buffer() as out:
+                out.pack_many(bin_struct, batch)
+                out.sendmsg(sock, header=header)
+
+    for func in (per_message_pack, precompiled_pack, pooled_pack_into, pooled_sendmsg):
+        result: list[str] = []
+        for trace in (False, True):
+            sender, receiver = socket.socketpair()
+            reader = threading.Thread(target=drain, args=(receiver,))
+            reader.start()
+
+            if trace:
+                tracemalloc.start()
+            t0 = time.perf_counter()
+            func(sender)
+            elapsed = time.perf_counter() - t0
+            if trace:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                result.append(f'peak traced memory {peak / KIB:>8.1f} KiB')
+            else:
+                result.append(f'{n / elapsed:>12,.0f} msgs/s')
+
+            sender.close()
+            reader.join()
+            receiver.close()
+        print(f'{func.__name__:>20}: ' + ', '.join(result))
+
+
+if __name__ == '__main__':
+    main()
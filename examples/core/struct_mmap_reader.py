@@ -0,0 +1,213 @@
+"""Read fixed-size binary records from file - memory-mapped, streaming.
+
+- `mmap` the file, iterate records by `Struct.iter_unpack()` over `memoryview`
+  slices, chunk by chunk. Processed pages are dropped by
+  `madvise(MADV_DONTNEED)`, so peak memory stays flat regardless of file size.
+- Random access by record index: `Struct.unpack_from()`.
+- Parallel scan: chunks across a process pool, each worker maps the file itself.
+- Vectorised: NumPy structured arrays (zero-copy views), see `struct_numpy_codec`.
+
+Run: `python -m examples.core.struct_mmap_reader`
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import resource
+import struct
+import tempfile
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self, TypeVar
+
+from examples.core.struct_numpy_codec import RecordCodec
+
+T = TypeVar('T')
+
+# Same format as `BinHandler`
+BIN_FMT = '! I 2s Q 2h f'
+
+CHUNK_RECORDS = 64 * 1024
+
+
+class RecordFile:
+    """Memory-mapped file of fixed-size binary records (read-only).
+
+    **NOTE**: Views (`memoryview`, NumPy arrays) must be released before
+    `close()`, otherwise `BufferError` is raised.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], fmt: str = BIN_FMT) -> None:
+        self.path = Path(path)
+        self.struct = struct.Struct(fmt)
+        self.size = self.struct.size
+        with open(self.path, 'rb') as f:
+            nbytes = os.fstat(f.fileno()).st_size
+            # can not mmap an empty file
+            self._mm = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if nbytes else None
+            )
+        self._count = nbytes // self.size  # trailing partial record is ignored
+        if self._mm is not None and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            self._mm.madvise(mmap.MADV_SEQUENTIAL)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> tuple[Any, ...]:
+        """Random access by record index."""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('record index out of range')
+        assert self._mm is not None
+        return self.struct.unpack_from(self._mm, index * self.size)
+
+    def _chunks(
+        self, start: int, stop: int | None, chunk_records: int
+    ) -> Iterator[tuple[int, int]]:
+        """Byte ranges `[begin, end)` of chunks of records `[start, stop)`."""
+        stop = self._count if stop is None else min(stop, self._count)
+        for i in range(start, stop, chunk_records):
+            yield i * self.size, min(i + chunk_records, stop) * self.size
+
+    def _release(self, begin: int, end: int) -> None:
+        """Drop pages of `[begin, end)` from memory (RSS), data stays in file."""
+        if self._mm is None or not hasattr(mmap, 'MADV_DONTNEED'):
+            return
+        begin -= begin % mmap.PAGESIZE  # must be page-aligned
+        self._mm.madvise(mmap.MADV_DONTNEED, begin, end - begin)
+
+    def iter_records(
+        self,
+        start: int = 0,
+        stop: int | None = None,
+        chunk_records: int = CHUNK_RECORDS,
+    ) -> Iterator[tuple[Any, ...]]:
+        """Iterate records `[start, stop)`."""
+        if self._mm is None:
+            return
+        for begin, end in self._chunks(start, stop, chunk_records):
+            yield from self.struct.iter_unpack(memoryview(self._mm)[begin:end])
+            self._release(begin, end)
+
+    def iter_arrays(
+        self,
+        start: int = 0,
+        stop: int | None = None,
+        chunk_records: int = CHUNK_RECORDS,
+    ) -> Iterator[Any]:
+        """Iterate chunks of records `[start, stop)` as NumPy structured arrays.
+
+        Arrays are zero-copy views of the file, do NOT keep them across chunks.
+        """
+        codec = RecordCodec(self.struct.format)
+        if codec.dtype is None:
+            raise RuntimeError('NumPy is required')
+        if self._mm is None:
+            return
+        for begin, end in self._chunks(start, stop, chunk_records):
+            arr = codec.unpack(self._mm, (end - begin) // self.size, begin)
+            yield arr
+            del arr
+            self._release(begin, end)
+
+
+def _scan_range(
+    path: Path,
+    fmt: str,
+    func: Callable[[Iterable[tuple[Any, ...]]], T],
+    span: tuple[int, int],
+) -> T:
+    with RecordFile(path, fmt) as f:
+        return func(f.iter_records(*span))
+
+
+def scan_parallel(
+    path: str | os.PathLike[str],
+    func: Callable[[Iterable[tuple[Any, ...]]], T],
+    *,
+    fmt: str = BIN_FMT,
+    max_workers: int | None = None,
+    chunk_records: int = 1024 * 1024,
+) -> list[T]:
+    """Apply `func` to chunks of records in a process pool.
+
+    `func` must be picklable (a module-level function). Results are returned
+    in file order, reduce them as needed.
+    """
+    with RecordFile(path, fmt) as f:
+        count = len(f)
+    spans = [(i, min(i + chunk_records, count)) for i in range(0, count, chunk_records)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(partial(_scan_range, Path(path), fmt, func), spans))
+
+
+def sum_seq(records: Iterable[tuple[Any, ...]]) -> int:
+    return sum(r[2] for r in records)
+
+
+def main() -> None:
+    value = (1, b'ab', 2, 3, 3, 2.5)
+    n = 2_000_000
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / 'records.bin'
+        record = struct.pack(BIN_FMT, *value)
+        with open(path, 'wb') as fp:
+            for _ in range(n // 1000):
+                fp.write(record * 1000)
+
+        with RecordFile(path) as rf:
+            assert len(rf) == n
+            assert rf[0] == value
+            assert rf[-1] == value
+
+            t0 = time.perf_counter()
+            total = sum_seq(rf.iter_records())
+            print(f'iter_records(): {time.perf_counter() - t0:.3f} seconds')
+            assert total == 2 * n
+
+            try:
+                t0 = time.perf_counter()
+                total = sum(int(a['f2'].sum()) for a in rf.iter_arrays())
+                print(f'iter_arrays(): {time.perf_counter() - t0:.3f} seconds')
+                assert total == 2 * n
+            except RuntimeError as err:
+                print(f'iter_arrays(): {err}')
+
+        t0 = time.perf_counter()
+        total = sum(scan_parallel(path, sum_seq))
+        print(f'scan_parallel(): {time.perf_counter() - t0:.3f} seconds')
+        assert total == 2 * n
+
+        print(
+            f'file size: {path.stat().st_size / 1024 / 1024:.1f} MiB, '
+            f'peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f}'
+            ' MiB'
+        )
+
+
+if __name__ == '__main__':
+    main()
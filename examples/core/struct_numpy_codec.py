@@ -0,0 +1,232 @@
+"""Pack/Unpack binary records in bulk - `struct` format as NumPy structured dtype.
+
+A `struct` format string is compiled into an equivalent NumPy structured
+`dtype` (same byte order, same offsets, no extra padding), so millions of
+records can be packed/unpacked in one vectorised call, e.g. `np.frombuffer()`
+on received buffers or memory-mapped files.
+
+Without NumPy, falls back to `struct.Struct.iter_unpack()`.
+"""
+
+from __future__ import annotations
+
+import re
+import socket
+import struct
+import time
+from collections.abc import Iterable, Mapping, Sequence
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment, unused-ignore]
+
+# struct byte order -> NumPy byte order
+BYTE_ORDERS = {'@': '=', '=': '=', '<': '<', '>': '>', '!': '>'}
+
+# Native sizes ('@'): same C types.
+NATIVE_TYPES = {
+    'c': 'S1',
+    'b': 'b',
+    'B': 'B',
+    '?': '?',
+    'h': 'h',
+    'H': 'H',
+    'i': 'i',
+    'I': 'I',
+    'l': 'l',
+    'L': 'L',
+    'q': 'q',
+    'Q': 'Q',
+    'n': 'p',  # ssize_t
+    'N': 'P',  # size_t
+    'P': 'P',  # void *
+    'e': 'e',
+    'f': 'f',
+    'd': 'd',
+}
+
+# Standard sizes ('=', '<', '>', '!')
+STANDARD_TYPES = {
+    'c': 'S1',
+    'b': 'i1',
+    'B': 'u1',
+    '?': '?',
+    'h': 'i2',
+    'H': 'u2',
+    'i': 'i4',
+    'I': 'u4',
+    'l': 'i4',
+    'L': 'u4',
+    'q': 'i8',
+    'Q': 'u8',
+    'e': 'f2',
+    'f': 'f4',
+    'd': 'f8',
+}
+
+FORMAT_ITEM = re.compile(r'(\d*)([a-zA-Z?])')
+
+
+def struct_to_dtype(fmt: str, names: Sequence[str] | None = None) -> Any:
+    """Compile `struct` format into NumPy structured `dtype`.
+
+    Each value of `struct.unpack()` maps to one field, e.g. `'2h'` is 2 fields,
+    `'2s'` is 1 field. Offsets are taken from `struct.calcsize()`, so native
+    alignment (`'@'`) is reproduced exactly.
+
+    :param `names`: field names, default to `'f0'`, `'f1'`, ...
+    """
+    if np is None:
+        raise RuntimeError('NumPy is required')
+
+    order = fmt[0] if fmt and fmt[0] in BYTE_ORDERS else '@'
+    body = fmt[1:] if fmt and fmt[0] in BYTE_ORDERS else fmt
+    types = NATIVE_TYPES if order == '@' else STANDARD_TYPES
+    np_order = BYTE_ORDERS[order]
+
+    formats: list[str] = []
+    offsets: list[int] = []
+    prefix = order
+    for count_str, code in FORMAT_ITEM.findall(body):
+        count = int(count_str) if count_str else 1
+        if code == 'x':
+            prefix += f'{count}x'
+            continue
+        if code == 's':
+            offsets.append(struct.calcsize(prefix))
+            formats.append(f'S{count}')
+            prefix += f'{count}s'
+            continue
+        if code not in types:
+            raise ValueError(f'unsupported format character {code!r} in {fmt!r}')
+        for _ in range(count):
+            # `'0<code>'` aligns to `<code>` without adding data.
+            offsets.append(struct.calcsize(f'{prefix}0{code}'))
+            formats.append(np_order + types[code])
+            prefix += code
+
+    if names is None:
+        names = [f'f{i}' for i in range(len(formats))]
+    elif len(names) != len(formats):
+        raise ValueError(f'{len(formats)} names required, got {len(names)}')
+
+    return np.dtype(
+        {
+            'names': list(names),
+            'formats': formats,
+            'offsets': offsets,
+            'itemsize': struct.calcsize(fmt),
+        }
+    )
+
+
+class RecordCodec:
+    """Bulk codec of fixed-size binary records.
+
+    **NOTE**: NumPy strips trailing `b'\\x00'` of `'s'`/`'c'` fields.
+    """
+
+    def __init__(self, fmt: str, names: Sequence[str] | None = None) -> None:
+        self.struct = struct.Struct(fmt)
+        self.dtype = struct_to_dtype(fmt, names) if np is not None else None
+
+    @property
+    def size(self) -> int:
+        return self.struct.size
+
+    def pack(self, records: Iterable[tuple[Any, ...]] | Any) -> bytes:
+        """Pack records (tuples, or a structured array) into bytes."""
+        if self.dtype is None:
+            buf = bytearray()
+            for record in records:
+                buf += self.struct.pack(*record)
+            return bytes(buf)
+        if isinstance(records, np.ndarray):
+            return records.astype(self.dtype, copy=False).tobytes()
+        if not isinstance(records, list):
+            records = list(records)
+        return np.array(records, dtype=self.dtype).tobytes()
+
+    def pack_columns(self, columns: Mapping[str, Any]) -> bytes:
+        """Pack column arrays (one per field) into bytes, NumPy only."""
+        if self.dtype is None:
+            raise RuntimeError('NumPy is required')
+        assert self.dtype.names is not None
+        arr = np.empty(len(columns[self.dtype.names[0]]), dtype=self.dtype)
+        for name in self.dtype.names:
+            arr[name] = columns[name]
+        return arr.tobytes()
+
+    def unpack(self, buffer: Any, count: int = -1, offset: int = 0) -> Any:
+        """Unpack records from a bytes-like object (`bytes`, `mmap`, ...).
+
+        Return a structured array (zero-copy view of `buffer`) with NumPy,
+        or a list of tuples without. A trailing partial record is ignored.
+        """
+        with memoryview(buffer) as view:
+            whole = (view.nbytes - offset) // self.size
+            count = whole if count < 0 else min(count, whole)
+            if self.dtype is None:
+                end = offset + count * self.size
+                return list(self.struct.iter_unpack(view.cast('B')[offset:end]))
+        return np.frombuffer(buffer, dtype=self.dtype, count=count, offset=offset)
+
+
+def recv_records(sock: socket.socket, codec: RecordCodec, count: int) -> Any:
+    """Receive exactly `count` records from stream socket."""
+    buf = bytearray(codec.size * count)
+    view = memoryview(buf)
+    got = 0
+    while got < len(buf):
+        n = sock.recv_into(view[got:])
+        if not n:
+            raise EOFError(f'{got} of {len(buf)} bytes received')
+        got += n
+    return codec.unpack(buf)
+
+
+def main() -> None:
+    fmt_str = '= I 2s Q 2h f'
+    value = (1, b'ab', 2, 3, 3, 2.5)
+    data: bytes = struct.pack(fmt_str, *value)
+
+    codec = RecordCodec(fmt_str, ['id', 'tag', 'seq', 'x', 'y', 'value'])
+    assert codec.pack([value]) == data
+    records = codec.unpack(data * 3)
+    assert len(records) == 3
+    assert tuple(records[0]) == value
+
+    # native alignment
+    if codec.dtype is not None:
+        assert struct_to_dtype('@ b i').itemsize == struct.calcsize('@ b i')
+        assert struct_to_dtype('@ b i').fields['f1'][1] == 4  # offset
+        assert struct_to_dtype('! b i').fields['f1'][1] == 1
+
+    # 1,000,000 records
+    n = 1_000_000
+    big = data * n
+
+    t0 = time.perf_counter()
+    tuples = [struct.unpack_from(fmt_str, big, i * codec.size) for i in range(n)]
+    print(f'struct.unpack_from() x {n}: {time.perf_counter() - t0:.3f} seconds')
+    assert len(tuples) == n
+
+    t0 = time.perf_counter()
+    rs = codec.unpack(big)
+    print(f'RecordCodec.unpack(): {time.perf_counter() - t0:.3f} seconds')
+    assert len(rs) == n
+
+    if codec.dtype is not None:
+        t0 = time.perf_counter()
+        assert codec.pack(rs) == big
+        print(f'RecordCodec.pack(): {time.perf_counter() - t0:.3f} seconds')
+
+        t0 = time.perf_counter()
+        assert codec.pack_columns({name: rs[name] for name in rs.dtype.names}) == big
+        print(f'RecordCodec.pack_columns(): {time.perf_counter() - t0:.3f} seconds')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Request deadline: `@app.middleware('http')` vs. `DeadlineMiddleware`.
+
+A 2 seconds endpoint behind a 0.2 seconds deadline, by calling the ASGI apps
+directly: `504` should come at the deadline, and the endpoint be cancelled.
+
+Run: `python -m examples.web.fastapi.bench_deadline`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from examples.core.asyncio_deadline import deadline
+from examples.web.fastapi.bench_static import request
+from examples.web.fastapi.middleware import DeadlineMiddleware
+
+TIMEOUT = 0.2
+SLOW = 2.0
+
+
+def create_app(cancelled: list[str]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get('/slow')
+    async def slow() -> dict[str, str]:
+        try:
+            await asyncio.sleep(SLOW)
+        except asyncio.CancelledError:
+            cancelled.append('slow')
+            raise
+        return {'msg': 'done'}
+
+    @app.get('/fast')
+    async def fast() -> dict[str, str]:
+        return {'msg': 'done'}
+
+    return app
+
+
+def with_http_middleware(app: FastAPI) -> FastAPI:
+    @app.middleware('http')
+    async def request_deadline(
+        request_: Request, call_next: Callable[[Request], Awaitable[Response]]
+    ) -> Response:
+        try:
+            async with deadline(TIMEOUT):
+                return await call_next(request_)
+        except TimeoutError:
+            return JSONResponse({'detail': 'Request Timeout'}, status_code=504)
+
+    return app
+
+
+def with_asgi_middleware(app: FastAPI) -> FastAPI:
+    app.add_middleware(DeadlineMiddleware, timeout=TIMEOUT)
+    return app
+
+
+async def main() -> None:
+    for wrap in (with_http_middleware, with_asgi_middleware):
+        cancelled: list[str] = []
+        app = wrap(create_app(cancelled))
+
+        status, _, _ = await request(app, '/fast', {})
+        assert status == 200, status
+
+        t0 = time.perf_counter()
+        status, _, body = await request(app, '/slow', {})
+        elapsed = time.perf_counter() - t0
+        print(
+            f'{wrap.__name__:>20}: {status} after {elapsed:.3f} seconds, '
+            f'endpoint cancelled: {bool(cancelled)}'
+        )
+        if wrap is with_asgi_middleware:
+            assert status == 504 and body == b'{"detail":"Request Timeout"}', body
+            assert elapsed < TIMEOUT + 0.05, elapsed
+            assert cancelled
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
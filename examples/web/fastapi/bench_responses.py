@@ -0,0 +1,119 @@
+"""Requests/second of JSON response paths, by calling the ASGI app directly.
+
+- `/hello/` before: a `BasicResponse` built, validated and serialised per request;
+- `/hello/` after: `PrecomputedJSON`;
+- `/api` before: a `dict` through `jsonable_encoder()` and `JSONResponse`
+  (`/api/encoder`), or validated and serialised by `pydantic-core` against the
+  return type `dict[str, Any]` (`/api/dict`, recent FastAPI);
+- `/api` after: `FastJSONResponse` (`orjson`, or `pydantic-core` without it).
+
+No server, no sockets: the difference is all in the framework and rendering.
+
+Run: `python -m examples.web.fastapi.bench_responses`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+from fastapi import FastAPI
+from starlette.types import Message, Scope
+
+from examples.web.fastapi import responses
+from examples.web.fastapi.responses import FastJSONResponse
+from examples.web.fastapi.routers import BasicResponse, hello
+
+# like a document of MongoDB
+DOC = {
+    'name': 'FastAPI App',
+    'created_at': datetime(2024, 1, 1, tzinfo=timezone.utc),
+    'tags': [f'tag-{i}' for i in range(20)],
+    'items': [{'id': i, 'price': i * 1.5, 'enabled': bool(i % 2)} for i in range(20)],
+}
+
+app = FastAPI()
+
+
+@app.get('/hello/model', response_model=BasicResponse)
+async def hello_model() -> BasicResponse:
+    return BasicResponse()
+
+
+app.get('/hello/precomputed', response_model=BasicResponse)(hello)
+
+
+@app.get('/api/encoder', response_model=None)
+async def api_encoder() -> Any:
+    return {'db': DOC}
+
+
+@app.get('/api/dict')
+async def api_dict() -> dict[str, Any]:
+    return {'db': DOC}
+
+
+@app.get('/api/fast')
+async def api_fast() -> FastJSONResponse:
+    return FastJSONResponse({'db': DOC})
+
+
+async def request(path: str) -> bytes:
+    scope: Scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': b'',
+        'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 50000),
+        'server': ('127.0.0.1', 8000),
+    }
+    body = b''
+
+    async def receive() -> Message:
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message: Message) -> None:
+        nonlocal body
+        if message['type'] == 'http.response.body':
+            body += message.get('body', b'')
+
+    await app(scope, receive, send)
+    return body
+
+
+async def rate(path: str, n: int) -> float:
+    best = float('inf')
+    for _ in range(5):  # best of 5
+        t0 = time.perf_counter()
+        for _ in range(n):
+            await request(path)
+        best = min(best, time.perf_counter() - t0)
+    return n / best
+
+
+async def main(n: int = 10_000) -> None:
+    assert await request('/hello/model') == await request('/hello/precomputed')
+    for path in ('/hello/model', '/hello/precomputed', '/api/encoder', '/api/dict'):
+        print(f'{path:>20}: {await rate(path, n):>8,.0f} req/s')
+
+    use_orjson = responses.USE_ORJSON
+    for renderer in ('orjson', 'pydantic-core'):
+        if renderer == 'pydantic-core':
+            responses.USE_ORJSON = False  # fallback
+        elif not use_orjson:
+            continue
+        fast = await rate('/api/fast', n)
+        print(f'{"/api/fast":>20}: {fast:>8,.0f} req/s ({renderer})')
+    responses.USE_ORJSON = use_orjson
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
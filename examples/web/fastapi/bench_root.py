@@ -0,0 +1,93 @@
+"""Latency of `/api` handler shapes, with local stand-ins of MongoDB, Redis and MQTT.
+
+- before: `find_one`, `GET`, then QoS 2 `publish`, one after another;
+- after: reads concurrently, `publish` queued to the background publisher.
+
+Round trip of each stand-in: 1 ms (QoS 2 publish: 2 round trips,
+PUBLISH/PUBREC and PUBREL/PUBCOMP), MongoDB query: +1 ms.
+
+Run: `python -m examples.web.fastapi.bench_root`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from examples.web.fastapi.publisher import MQTTPublisher
+
+RTT = 0.001
+
+
+class Mongo:
+    async def find_one(self, filter_: dict[str, Any]) -> dict[str, Any]:
+        await asyncio.sleep(RTT + 0.001)
+        return {'name': filter_['name']}
+
+
+class Redis:
+    async def get(self, key: str) -> str:
+        await asyncio.sleep(RTT)
+        return key
+
+
+class MQTT:
+    async def publish(  # pylint: disable=unused-argument
+        self, topic: str, payload: str | bytes, *, qos: int = 0, retain: bool = False
+    ) -> None:
+        await asyncio.sleep(RTT * qos)  # QoS 0: no acknowledgement
+
+
+async def measure(
+    handler: Callable[[], Awaitable[Any]], n: int, concurrency: int
+) -> list[float]:
+    """Latencies of `n` calls of `handler`, `concurrency` at a time."""
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request() -> None:
+        async with semaphore:
+            t0 = time.perf_counter()
+            await handler()
+            latencies.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*(request() for _ in range(n)))
+    return latencies
+
+
+async def main(n: int = 2000, concurrency: int = 50) -> None:
+    mongo, redis, mqtt = Mongo(), Redis(), MQTT()
+
+    async def before() -> dict[str, Any]:
+        db_doc = await mongo.find_one({'name': 'xxx'})
+        cache_val = await redis.get('key')
+        await mqtt.publish('topic', b'{"msg": "hello"}', qos=2)
+        return {'db': db_doc, 'cache': cache_val}
+
+    publisher = MQTTPublisher(
+        mqtt, maxsize=1000, inflight={2: 32}  # type: ignore[arg-type]
+    )
+    async with publisher:
+
+        async def after() -> dict[str, Any]:
+            await publisher.publish('topic', b'{"msg": "hello"}', qos=2)
+            db_doc, cache_val = await asyncio.gather(
+                mongo.find_one({'name': 'xxx'}), redis.get('key')
+            )
+            return {'db': db_doc, 'cache': cache_val}
+
+        for name, handler in (('before', before), ('after', after)):
+            latencies = await measure(handler, n, concurrency)
+            q = statistics.quantiles(latencies, n=100)
+            print(f'{name:>8}: p50 {q[49] * 1000:.2f} ms, p99 {q[98] * 1000:.2f} ms')
+    snapshot = publisher.snapshot()  # drained
+    print(
+        f"publisher: {snapshot['published']} published, {snapshot['dropped']} dropped"
+    )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
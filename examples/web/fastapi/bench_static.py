@@ -0,0 +1,99 @@
+"""`StaticFiles` vs. `PrecompressedStaticFiles`, by calling the ASGI apps directly.
+
+Requests for `swagger-ui-bundle.js` (1.6 MB), by a browser
+(`Accept-Encoding: gzip, deflate, br`), and revalidations (`If-None-Match`).
+
+Run: `python -m examples.web.fastapi.bench_static`
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from fastapi.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Message, Scope
+
+from examples.web.fastapi.static import PrecompressedStaticFiles
+
+DIRECTORY = 'examples/web/fastapi/static'
+NAME = 'swagger-ui-bundle.js'
+
+
+async def request(
+    app: ASGIApp, path: str, headers: dict[str, str], query: str = ''
+) -> tuple[int, dict[str, str], bytes]:
+    scope: Scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': query.encode(),
+        'headers': [(k.encode(), v.encode()) for k, v in headers.items()],
+    }
+    status = 0
+    response_headers: dict[str, str] = {}
+    body = b''
+
+    requested = False
+
+    async def receive() -> Message:
+        nonlocal requested
+        if requested:
+            await asyncio.Future()  # no disconnect
+        requested = True
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message: Message) -> None:
+        nonlocal status, body
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            response_headers.update(
+                (k.decode(), v.decode()) for k, v in message['headers']
+            )
+        elif message['type'] == 'http.response.body':
+            body += message.get('body', b'')
+
+    await app(scope, receive, send)
+    return status, response_headers, body
+
+
+async def rate(app: ASGIApp, headers: dict[str, str], n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        await request(app, f'/{NAME}', headers)
+    return n / (time.perf_counter() - t0)
+
+
+async def main(n: int = 500) -> None:
+    static = StaticFiles(directory=DIRECTORY)
+    precompressed = PrecompressedStaticFiles(DIRECTORY)
+    t0 = time.perf_counter()
+    precompressed.load()
+    print(f'load: {time.perf_counter() - t0:.3f} seconds')
+
+    browser = {'accept-encoding': 'gzip, deflate, br'}
+    for name, app in (('StaticFiles', static), ('precompressed', precompressed)):
+        _, headers, body = await request(app, f'/{NAME}', browser)
+        etag = headers['etag']
+        revalidate = {**browser, 'if-none-match': etag}
+        status, _, _ = await request(app, f'/{NAME}', revalidate)
+        assert status == 304
+        print(
+            f'{name:>14}: {len(body):>9,} bytes '
+            f'({headers.get("content-encoding", "identity")}), '
+            f'{await rate(app, browser, n):>7,.0f} req/s, '
+            f'304: {await rate(app, revalidate, n):>7,.0f} req/s, '
+            f'cache-control: {headers.get("cache-control")}'
+        )
+    version = precompressed.version(NAME)
+    _, headers, _ = await request(precompressed, f'/{NAME}', browser, f'v={version}')
+    print(f'{"?v=" + version:>14}: cache-control: {headers["cache-control"]}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
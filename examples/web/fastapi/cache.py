@@ -0,0 +1,274 @@
+"""Two-tier read-through cache.
+
+- L1: in-process LRU with TTL, per worker process.
+- L2: Redis, shared by all workers, keys under `prefix`.
+- Source of truth (e.g. MongoDB) behind both, read by a `loader`.
+
+Against stampedes and thundering herds:
+
+- **Negative caching**: "not found" (`None`) is cached too, with a shorter TTL,
+  so missing keys do not hit the database on every request.
+- **TTL jitter**: TTLs are randomised (±`jitter`), so keys cached together do not
+  expire together.
+- **Probabilistic early refresh** (XFetch): a reader refreshes an entry before
+  it expires, with a probability growing as expiry gets closer, and with the
+  time the loader took (`delta`): one reader refreshes, the others are still
+  served from the cache.
+- **Single-flight**: concurrent misses of a key share one load.
+
+Hit/miss counters of each tier are exported by `snapshot()`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import random
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from examples.core.asyncio_deadline import redis_get
+from examples.core.asyncio_hedged import LatencyTracker, hedged
+from examples.core.asyncio_single_flight import SingleFlight
+
+LOGGER = logging.getLogger('uvicorn')
+
+
+@dataclass(slots=True)
+class _Entry:
+    value: Any  # `None`: negative entry
+    expires_at: float  # `time.time()`
+    delta: float  # seconds the loader took
+
+
+@dataclass(slots=True)
+class CacheStats:  # pylint: disable=too-many-instance-attributes
+    l1_hits: int = 0
+    l1_misses: int = 0
+    l2_hits: int = 0
+    l2_misses: int = 0
+    l2_errors: int = 0
+    negative_hits: int = 0
+    early_refreshes: int = 0
+    loads: int = 0
+    load_errors: int = 0
+
+
+class LRUCache:
+    """In-process LRU with TTL (`_Entry.expires_at`)."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str, now: float) -> _Entry | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: _Entry) -> None:
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+
+
+class TwoTierCache:  # pylint: disable=too-many-instance-attributes
+    """Read-through cache: L1 (in-process), L2 (Redis), then `loader`.
+
+    :param `redis`: L2, `None` for L1 only
+    :param `prefix`: of L2 keys
+    :param `l1_ttl`: seconds, also bounded by the L2 expiry
+    :param `negative_ttl`: seconds, for "not found" (`None`)
+    :param `jitter`: TTLs are multiplied by `1 ± jitter`
+    :param `beta`: early refresh, > 1 favours earlier, 0 disables it
+    :param `flight`: single-flight of loads
+    :param `l2_attempts`: hedged L2 reads (backup after p95 of `l2_tracker`)
+    """
+
+    def __init__(
+        self,
+        redis: Redis | None,
+        *,
+        prefix: str,
+        l1_maxsize: int = 10_000,
+        l1_ttl: float = 5.0,
+        l2_ttl: float = 60.0,
+        negative_ttl: float = 10.0,
+        jitter: float = 0.1,
+        beta: float = 1.0,
+        flight: SingleFlight[Any, Any] | None = None,
+        l2_attempts: int = 1,
+        l2_tracker: LatencyTracker | None = None,
+        dumps: Callable[[Any], str] = lambda v: json.dumps(v, default=str),
+        loads: Callable[[str | bytes], Any] = json.loads,
+    ) -> None:
+        self._redis = redis
+        self.prefix = prefix
+        self._l1 = LRUCache(l1_maxsize)
+        self.l1_ttl = l1_ttl
+        self.l2_ttl = l2_ttl
+        self.negative_ttl = negative_ttl
+        self.jitter = jitter
+        self.beta = beta
+        self._flight: SingleFlight[Any, Any] = flight or SingleFlight()
+        self.l2_attempts = l2_attempts
+        self._l2_tracker = l2_tracker
+        self._dumps = dumps
+        self._loads = loads
+        self.stats = CacheStats()
+
+    def _ttl(self, ttl: float) -> float:
+        return ttl * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _refresh_early(self, entry: _Entry, now: float) -> bool:
+        """XFetch: `now - delta * beta * ln(rand()) >= expiry`."""
+        if not self.beta:
+            return False
+        # `1.0 - random()` is in (0, 1]
+        gap = -entry.delta * self.beta * math.log(1.0 - random.random())
+        return now + gap >= entry.expires_at
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Value of `key`, `None` if not found (by `loader`)."""
+        now = time.time()
+        entry = self._l1.get(key, now)
+        if entry is not None and not self._refresh_early(entry, now):
+            self.stats.l1_hits += 1
+            if entry.value is None:
+                self.stats.negative_hits += 1
+            return entry.value
+        self.stats.l1_misses += 1
+        if entry is not None:
+            self.stats.early_refreshes += 1
+
+        # single-flight: concurrent misses of `key` share one L2 read / load
+        try:
+            return await self._flight.do(
+                ('cache', key), lambda: self._fill(key, loader)
+            )
+        except Exception:  # pylint: disable=broad-exception-caught
+            if entry is None:
+                raise
+            return entry.value  # early refresh failed, still fresh
+
+    async def _fill(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        now = time.time()
+        entry = await self._l2_get(key)
+        if entry is not None and entry.expires_at <= now:
+            entry = None  # expired (clock skew, or Redis TTL not reached yet)
+        stale: _Entry | None = None  # if refreshed early
+        if entry is not None:
+            if self._refresh_early(entry, now):
+                self.stats.early_refreshes += 1
+                stale = entry
+            else:
+                self.stats.l2_hits += 1
+                if entry.value is None:
+                    self.stats.negative_hits += 1
+                self._l1_set(key, entry, now)
+                return entry.value
+        else:
+            self.stats.l2_misses += 1
+
+        t0 = time.perf_counter()
+        try:
+            value = await loader()
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.stats.load_errors += 1
+            if stale is None:
+                raise
+            self._l1_set(key, stale, now)
+            return stale.value  # early refresh failed, still fresh
+        self.stats.loads += 1
+        now = time.time()
+        ttl = self._ttl(self.l2_ttl if value is not None else self.negative_ttl)
+        entry = _Entry(value, now + ttl, time.perf_counter() - t0)
+        self._l1_set(key, entry, now)
+        await self._l2_set(key, entry, ttl)
+        return value
+
+    def _l1_set(self, key: str, entry: _Entry, now: float) -> None:
+        expires_at = min(entry.expires_at, now + self._ttl(self.l1_ttl))
+        self._l1.set(key, _Entry(entry.value, expires_at, entry.delta))
+
+    def _l2_key(self, key: str) -> str:
+        return f'{self.prefix}:{key}'
+
+    async def _l2_get(self, key: str) -> _Entry | None:
+        if self._redis is None:
+            return None
+        redis = self._redis
+        try:
+            if self.l2_attempts > 1:
+                raw = await hedged(
+                    lambda: redis_get(redis, self._l2_key(key)),
+                    max_attempts=self.l2_attempts,
+                    tracker=self._l2_tracker,
+                )
+            else:
+                raw = await redis_get(redis, self._l2_key(key))
+        except (RedisError, OSError) as err:
+            # L2 is an optimisation: fall through to the loader
+            self.stats.l2_errors += 1
+            LOGGER.warning(f'cache L2 get {key!r} failed: {err!r}')
+            return None
+        if raw is None:
+            return None
+        try:
+            envelope = self._loads(raw)
+            return _Entry(envelope['v'], float(envelope['e']), float(envelope['d']))
+        except (ValueError, TypeError, KeyError) as err:
+            # not an envelope (e.g. written by another version): a miss
+            LOGGER.warning(f'cache L2 get {key!r}: invalid entry: {err!r}')
+            return None
+
+    async def _l2_set(self, key: str, entry: _Entry, ttl: float) -> None:
+        if self._redis is None:
+            return
+        envelope = {'v': entry.value, 'e': entry.expires_at, 'd': entry.delta}
+        try:
+            await self._redis.set(
+                self._l2_key(key),
+                self._dumps(envelope),
+                px=max(1, int(ttl * 1000)),
+            )
+        except (RedisError, OSError) as err:
+            self.stats.l2_errors += 1
+            LOGGER.warning(f'cache L2 set {key!r} failed: {err!r}')
+
+    async def invalidate(self, key: str) -> None:
+        """Drop `key` from L1 of this worker, and from L2.
+
+        **NOTE**: L1 of other workers keeps it for up to `l1_ttl` seconds.
+        """
+        self._l1.pop(key)
+        if self._redis is not None:
+            await self._redis.delete(self._l2_key(key))
+
+    def snapshot(self) -> dict[str, Any]:
+        stats = asdict(self.stats)
+        l1_total = self.stats.l1_hits + self.stats.l1_misses
+        l2_total = self.stats.l2_hits + self.stats.l2_misses
+        stats['l1_hit_ratio'] = self.stats.l1_hits / l1_total if l1_total else 0.0
+        stats['l2_hit_ratio'] = self.stats.l2_hits / l2_total if l2_total else 0.0
+        stats['l1_size'] = len(self._l1)
+        return stats
@@ -0,0 +1,126 @@
+"""MQTT consumer: a fixed pool of workers, sharded by topic.
+
+A task per incoming message has no bound: a burst creates as many tasks (and as
+much memory) as messages, and messages of a topic may complete out of order.
+
+Instead, messages go to one of `shards` bounded queues by topic (`crc32(topic) %
+shards`), each with one worker:
+
+- at most `shards` handlers run at a time, at most `shards * queue_size` messages
+  are queued;
+- messages of a topic are handled one at a time, in order;
+- when the queue of a shard is full, the receive loop waits (backpressure), so
+  messages stay in the queue of the MQTT client.
+
+**NOTE**: Backpressure stops at the client: `paho-mqtt` keeps reading the socket
+(and acknowledging QoS 1/2) into `client.messages`, unbounded by default. Bound it
+by `max_queued_incoming_messages` of `aiomqtt.Client`, then messages over it are
+discarded (with a warning "Message queue is full. Discarding message.").
+
+Metrics of each shard (queue wait, handler time, depth histograms, utilisation)
+are exported by `snapshot()`. A hot shard (topic) shows as one busy worker.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import zlib
+from collections.abc import Awaitable, Callable
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Self
+
+from examples.core.asyncio_queue_metrics import InstrumentedQueue, run_worker
+from examples.web.fastapi.publisher import COALESCED_SUFFIX
+
+if TYPE_CHECKING:
+    import aiomqtt
+
+LOGGER = logging.getLogger('uvicorn')
+
+
+class MQTTConsumer:  # pylint: disable=too-many-instance-attributes
+    """Handle incoming messages by `shards` workers, in order within a topic."""
+
+    def __init__(
+        self,
+        handler: Callable[[aiomqtt.Message], Awaitable[Any]],
+        *,
+        shards: int = 8,
+        queue_size: int = 100,
+        drain_timeout: float = 5.0,
+    ) -> None:
+        if shards < 1:
+            raise ValueError('shards must be >= 1')
+        self._handler = handler
+        self._queues: list[InstrumentedQueue[aiomqtt.Message]] = [
+            InstrumentedQueue(queue_size) for _ in range(shards)
+        ]
+        self.drain_timeout = drain_timeout
+        self._workers: list[asyncio.Task[None]] = []
+        self._client: aiomqtt.Client | None = None
+
+        self.received = 0
+        self.blocked = 0  # puts that waited for a full shard
+        self.errors = 0
+
+    async def __aenter__(self) -> Self:
+        self._workers = [
+            asyncio.create_task(
+                run_worker(queue, self._handle), name=f'mqtt-consumer-{i}'
+            )
+            for i, queue in enumerate(self._queues)
+        ]
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        with contextlib.suppress(TimeoutError):
+            async with asyncio.timeout(self.drain_timeout):
+                for queue in self._queues:
+                    await queue.join()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        lost = sum(queue.qsize() for queue in self._queues)
+        if lost:
+            LOGGER.warning(f'MQTT consumer: {lost} messages lost')
+
+    def shard(self, topic: str) -> int:
+        # coalesced payloads of a topic go to its shard too, in order
+        topic = topic.removesuffix(COALESCED_SUFFIX)
+        # not `hash()`: randomised per process (`PYTHONHASHSEED`)
+        return zlib.crc32(topic.encode('utf-8')) % len(self._queues)
+
+    async def listen(self, client: aiomqtt.Client) -> None:
+        """Receive loop: dispatch messages of `client` to their shard."""
+        self._client = client
+        async for message in client.messages:
+            queue = self._queues[self.shard(message.topic.value)]
+            if queue.full():
+                self.blocked += 1
+            await queue.put(message)
+            self.received += 1
+
+    async def _handle(self, message: aiomqtt.Message) -> None:
+        try:
+            await self._handler(message)
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            self.errors += 1
+            LOGGER.warning(f'MQTT message of {message.topic.value!r} failed: {err!r}')
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            'received': self.received,
+            'blocked': self.blocked,
+            'errors': self.errors,
+            # `client.messages`, not dispatched yet
+            'client_queue': len(self._client.messages) if self._client else 0,
+            'depth': [queue.qsize() for queue in self._queues],
+            'shards': [queue.metrics.snapshot() for queue in self._queues],
+        }
@@ -1,12 +1,11 @@
 """FastAPI with App."""
 
 import asyncio
-import json
 import logging
 import os
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
-from typing import TypedDict
+from typing import Any, TypedDict
 
 import aiomqtt
 from fastapi import FastAPI, Request
@@ -15,19 +14,30 @@ from fastapi.openapi.docs import (
     get_swagger_ui_html,
     get_swagger_ui_oauth2_redirect_html,
 )
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import Response
 from motor.motor_asyncio import AsyncIOMotorClient
 from redis.asyncio import Redis
 
+from examples.core.asyncio_deadline import mongo_find_one, redis_get
+from examples.core.asyncio_hedged import LatencyTracker, hedged
+from examples.core.asyncio_loop_monitor import LoopMonitor, log_stall
+from examples.core.asyncio_single_flight import SingleFlight
+from examples.web.fastapi.cache import TwoTierCache
+from examples.web.fastapi.consumer import MQTTConsumer
+from examples.web.fastapi.middleware import DeadlineMiddleware
+from examples.web.fastapi.publisher import MQTTPublisher, split_coalesced
+from examples.web.fastapi.responses import FastJSONResponse, dumps
 from examples.web.fastapi.routers import router
 from examples.web.fastapi.settings import get_settings
+from examples.web.fastapi.static import PrecompressedStaticFiles
 from examples.web.fastapi.workers import handle_bytes
 
 settings = get_settings()
 
 API_DOC_STATIC_DIR = 'examples/web/fastapi/static'
 API_DOC_STATIC_PATH = f'{settings.app_doc_url}/{API_DOC_STATIC_DIR}'
+# Swagger UI, ReDoc bundles, and docs HTML: precompressed in memory
+DOC_ASSETS = PrecompressedStaticFiles(API_DOC_STATIC_DIR)
 
 LOGGER = logging.getLogger('uvicorn')
 
@@ -35,18 +45,32 @@ MONGODB_CLIENT: AsyncIOMotorClient = AsyncIOMotorClient(str(settings.mongodb_url
 DB_XXX = MONGODB_CLIENT[settings.mongodb_db_name]
 TB_XXX = DB_XXX['examples']
 
+# p95 latency of reads, for hedging
+MONGODB_LATENCY = LatencyTracker()
+CACHE_LATENCY = LatencyTracker()
+
+# concurrent identical reads share one in-flight call
+SINGLE_FLIGHT: SingleFlight[tuple[str, str], Any] = SingleFlight()
+
+# constant MQTT payload, rendered once
+HELLO_MESSAGE = dumps({'msg': 'hello'})
+
 
 class State(TypedDict):
     redis_client: Redis
     mqtt_client: aiomqtt.Client
+    mqtt_publisher: MQTTPublisher
+    mqtt_consumer: MQTTConsumer
+    loop_monitor: LoopMonitor
+    cache: TwoTierCache
 
 
-async def mqtt_listen(client: aiomqtt.Client) -> None:
-    async with asyncio.TaskGroup() as tg:
-        async for message in client.messages:
-            msg = message.payload
-            if isinstance(msg, bytes):
-                tg.create_task(handle_bytes(msg), name=str(message.mid))
+async def handle_message(message: aiomqtt.Message) -> None:
+    if isinstance(message.payload, bytes):
+        # coalesced by the publisher: one message per line
+        _, payloads = split_coalesced(message.topic.value, message.payload)
+        for payload in payloads:
+            await handle_bytes(payload)
 
 
 @asynccontextmanager
@@ -54,7 +78,17 @@ async def lifespan(_: FastAPI) -> AsyncGenerator:
 
     loop = asyncio.get_event_loop()
 
+    # compress once, in a thread: the event loop is running already
+    await asyncio.to_thread(DOC_ASSETS.load)
+    render_docs()
+
     async with (
+        LoopMonitor(
+            settings.loop_monitor_interval,
+            settings.loop_monitor_threshold,
+            on_stall=log_stall,
+            profile_callbacks=settings.loop_monitor_profile,
+        ) as loop_monitor,
         Redis.from_url(
             url=str(settings.redis_url),
             encoding='utf-8',
@@ -71,13 +105,57 @@ async def lifespan(_: FastAPI) -> AsyncGenerator:
             password=settings.mqtt_password,
             timeout=settings.mqtt_timeout,
             identifier=f'python-cookbook-{os.getpid()}',
+            # QoS 1/2 in flight, at least the caps of the publisher
+            max_inflight_messages=settings.mqtt_publish_inflight_qos1
+            + settings.mqtt_publish_inflight_qos2,
+            # backpressure of the consumer ends here
+            max_queued_incoming_messages=settings.mqtt_max_queued_incoming,
         ) as mqtt_client,
+        # exits (drains) before the MQTT client
+        MQTTPublisher(
+            mqtt_client,
+            maxsize=settings.mqtt_publish_queue_size,
+            overflow=settings.mqtt_publish_overflow,
+            inflight={
+                0: settings.mqtt_publish_inflight_qos0,
+                1: settings.mqtt_publish_inflight_qos1,
+                2: settings.mqtt_publish_inflight_qos2,
+            },
+            coalesce_max_bytes=settings.mqtt_publish_coalesce_bytes,
+        ) as mqtt_publisher,
+        MQTTConsumer(
+            handle_message,
+            shards=settings.mqtt_consume_shards,
+            queue_size=settings.mqtt_consume_queue_size,
+        ) as mqtt_consumer,
     ):
         # Subscribe MQTT
         await mqtt_client.subscribe(f'{settings.mqtt_topic_prefix}/#')
-        task = loop.create_task(mqtt_listen(mqtt_client))
+        task = loop.create_task(mqtt_consumer.listen(mqtt_client))
+
+        # L1: per worker process, L2: Redis
+        cache = TwoTierCache(
+            redis_client,
+            prefix=settings.cache_prefix,
+            l1_maxsize=settings.cache_l1_maxsize,
+            l1_ttl=settings.cache_l1_ttl,
+            l2_ttl=settings.cache_ttl,
+            negative_ttl=settings.cache_negative_ttl,
+            jitter=settings.cache_ttl_jitter,
+            beta=settings.cache_early_refresh_beta,
+            flight=SINGLE_FLIGHT,
+            l2_attempts=settings.hedge_max_attempts,
+            l2_tracker=CACHE_LATENCY,
+        )
 
-        yield {'redis_client': redis_client, 'mqtt_client': mqtt_client}
+        yield {
+            'redis_client': redis_client,
+            'mqtt_client': mqtt_client,
+            'mqtt_publisher': mqtt_publisher,
+            'mqtt_consumer': mqtt_consumer,
+            'loop_monitor': loop_monitor,
+            'cache': cache,
+        }
 
         task.cancel()
         try:
@@ -92,61 +170,151 @@ async def lifespan(_: FastAPI) -> AsyncGenerator:
 
 app: FastAPI = FastAPI(
     title=settings.app_name,
-    docs_url=settings.app_doc_url,
+    docs_url=None,  # served by `custom_swagger_ui_html()`, precompressed
+    redoc_url=None,  # served by `redoc_html()`
     debug=settings.debug,
     openapi_url=f'{settings.app_doc_url}/openapi.json',
     description=settings.app_description,
     version=settings.app_version,
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
-app.mount(API_DOC_STATIC_PATH, StaticFiles(directory=API_DOC_STATIC_DIR), name='static')
+app.mount(API_DOC_STATIC_PATH, DOC_ASSETS, name='static')
 assert isinstance(app.swagger_ui_oauth2_redirect_url, str)
 
 
-@app.head(settings.app_doc_url, include_in_schema=False)
-@app.get(settings.app_doc_url, include_in_schema=False)
-async def custom_swagger_ui_html() -> HTMLResponse:
-    """Custom Swagger UI"""
+# Deadline of the request (504), propagated to downstream calls by `contextvars`.
+# Pure ASGI, not `@app.middleware('http')`: the endpoint runs in the request task,
+# so it is cancelled at the deadline.
+app.add_middleware(DeadlineMiddleware, timeout=settings.request_timeout)
+
+
+def doc_asset_url(name: str) -> str:
+    """Versioned: cached by browsers for a year, busted by a new version."""
+    return f'{API_DOC_STATIC_PATH}/{name}?v={DOC_ASSETS.version(name)}'
+
+
+def render_docs() -> None:
+    """Render the docs HTML once, after `DOC_ASSETS.load()`."""
+    if not DOC_ASSETS.loaded:
+        DOC_ASSETS.load()  # not loaded at startup: blocks the event loop once
     assert isinstance(app.openapi_url, str)
-    return get_swagger_ui_html(
+    swagger_ui = get_swagger_ui_html(
         openapi_url=app.openapi_url,
         title=app.title + ' - Swagger UI',
         oauth2_redirect_url=app.swagger_ui_oauth2_redirect_url,
-        swagger_js_url=f'{API_DOC_STATIC_PATH}/swagger-ui-bundle.js',
-        swagger_css_url=f'{API_DOC_STATIC_PATH}/swagger-ui.css',
+        swagger_js_url=doc_asset_url('swagger-ui-bundle.js'),
+        swagger_css_url=doc_asset_url('swagger-ui.css'),
+    )
+    redoc = get_redoc_html(
+        openapi_url=app.openapi_url,
+        title=app.title + ' - ReDoc',
+        redoc_js_url=doc_asset_url('redoc.standalone.js'),
     )
+    redirect = get_swagger_ui_oauth2_redirect_html()
+    # revalidated by `ETag`: it refers to the current versions
+    for name, response in (
+        ('swagger-ui.html', swagger_ui),
+        ('redoc.html', redoc),
+        ('oauth2-redirect.html', redirect),
+    ):
+        DOC_ASSETS.add(name, bytes(response.body), cache_control='no-cache')
+
+
+def doc_page(name: str, request: Request) -> Response:
+    if name not in DOC_ASSETS:
+        render_docs()  # lifespan not run, e.g. `uvicorn --lifespan off`
+    return DOC_ASSETS.response(name, request.headers, method=request.method)
+
+
+@app.head(settings.app_doc_url, include_in_schema=False)
+@app.get(settings.app_doc_url, include_in_schema=False)
+async def custom_swagger_ui_html(request: Request) -> Response:
+    """Custom Swagger UI"""
+    return doc_page('swagger-ui.html', request)
 
 
 @app.get(app.swagger_ui_oauth2_redirect_url, include_in_schema=False)
-async def swagger_ui_redirect() -> HTMLResponse:
+async def swagger_ui_redirect(request: Request) -> Response:
     """Swagger UI redirect"""
-    return get_swagger_ui_oauth2_redirect_html()
+    return doc_page('oauth2-redirect.html', request)
 
 
 @app.get(f'{settings.app_doc_url}/redoc', include_in_schema=False)
-async def redoc_html() -> HTMLResponse:
+async def redoc_html(request: Request) -> Response:
     """Custom redoc html."""
-    assert isinstance(app.openapi_url, str)
-    return get_redoc_html(
-        openapi_url=app.openapi_url,
-        title=app.title + ' - ReDoc',
-        redoc_js_url=f'{API_DOC_STATIC_PATH}/redoc.standalone.js',
-    )
+    return doc_page('redoc.html', request)
 
 
 @app.get('/api')
-async def root(request: Request) -> dict[str, str | None]:
-    db_doc = await TB_XXX.find_one({'name': settings.app_name})
-    cache_val = await request.state.redis_client.get(
-        f'{settings.cache_prefix}:examples'
+async def root(request: Request) -> FastJSONResponse:
+    cache: TwoTierCache = request.state.cache
+    redis_client: Redis = request.state.redis_client
+    cache_key = f'{settings.cache_prefix}:examples'
+
+    # independent reads, concurrently; within the remaining budget of the request
+    # (`gather()`, not `TaskGroup`: a `TimeoutError` is not wrapped, so it is a 504)
+    db_doc, cache_val = await asyncio.gather(
+        # L1, L2 (Redis), then MongoDB
+        cache.get(
+            f'examples:{settings.app_name}',
+            lambda: hedged(
+                lambda: mongo_find_one(
+                    TB_XXX, {'name': settings.app_name}, projection={'_id': False}
+                ),
+                max_attempts=settings.hedge_max_attempts,
+                tracker=MONGODB_LATENCY,
+            ),
+        ),
+        SINGLE_FLIGHT.do(
+            ('redis', cache_key),
+            lambda: hedged(
+                lambda: redis_get(redis_client, cache_key),
+                max_attempts=settings.hedge_max_attempts,
+                tracker=CACHE_LATENCY,
+            ),
+        ),
     )
-    await request.state.mqtt_client.publish(
+    # off the response path: queued, published in background
+    mqtt_publisher: MQTTPublisher = request.state.mqtt_publisher
+    await mqtt_publisher.publish(
         f'{settings.mqtt_topic_prefix}/example',
-        payload=json.dumps({'msg': 'hello'}, ensure_ascii=False),
+        HELLO_MESSAGE,
         qos=settings.mqtt_qos,
     )
-    return {'db': db_doc, 'cache': cache_val}
+    # rendered directly, without `jsonable_encoder()`
+    return FastJSONResponse({'db': db_doc, 'cache': cache_val})
+
+
+@app.get('/api/metrics/loop', include_in_schema=False)
+async def loop_metrics(request: Request) -> dict[str, Any]:
+    """Event loop lag and callback duration histograms."""
+    return request.state.loop_monitor.snapshot()
+
+
+@app.get('/api/metrics/single-flight', include_in_schema=False)
+async def single_flight_metrics() -> dict[str, Any]:
+    """Coalescing of concurrent identical reads."""
+    return SINGLE_FLIGHT.snapshot()
+
+
+@app.get('/api/metrics/cache', include_in_schema=False)
+async def cache_metrics(request: Request) -> dict[str, Any]:
+    """Hits and misses of each cache tier, of this worker."""
+    return request.state.cache.snapshot()
+
+
+@app.get('/api/metrics/mqtt-publisher', include_in_schema=False)
+async def mqtt_publisher_metrics(request: Request) -> dict[str, Any]:
+    """Queue depth and counters of the background MQTT publisher."""
+    return request.state.mqtt_publisher.snapshot()
+
+
+@app.get('/api/metrics/mqtt-consumer', include_in_schema=False)
+async def mqtt_consumer_metrics(request: Request) -> dict[str, Any]:
+    """Queues and workers of each shard of the MQTT consumer."""
+    return request.state.mqtt_consumer.snapshot()
 
 
 app.include_router(router, prefix='/api/router', tags=['router'])
@@ -0,0 +1,50 @@
+"""Request deadline, as a pure ASGI middleware.
+
+`@app.middleware('http')` (`BaseHTTPMiddleware`) runs the endpoint in a child
+task, reading its response from a stream: a timeout in the middleware does not
+cancel the endpoint, the response comes after the endpoint finishes anyway.
+
+`DeadlineMiddleware` wraps `app(scope, receive, send)` in `deadline()`, in the
+task of the request: the endpoint is cancelled at the deadline, and the deadline
+is propagated to downstream calls by `contextvars`.
+"""
+
+from __future__ import annotations
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from examples.core.asyncio_deadline import deadline
+
+
+class DeadlineMiddleware:
+    """`504 Gateway Timeout` if a request is not done within `timeout` seconds.
+
+    Raised `TimeoutError` (including `DeadlineExceeded`) is turned into a 504,
+    unless the response has started already.
+    """
+
+    def __init__(self, app: ASGIApp, timeout: float | None) -> None:
+        self.app = app
+        self.timeout = timeout
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = False
+
+        async def send_started(message: Message) -> None:
+            nonlocal started
+            started = started or message['type'] == 'http.response.start'
+            await send(message)
+
+        try:
+            async with deadline(self.timeout):
+                await self.app(scope, receive, send_started)
+        except TimeoutError:
+            if started:
+                raise
+            response = JSONResponse({'detail': 'Request Timeout'}, status_code=504)
+            await response(scope, receive, send)
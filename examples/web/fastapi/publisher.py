@@ -0,0 +1,338 @@
+"""Background MQTT publisher, off the response path.
+
+Requests put messages into a bounded queue (one per QoS level) and return at
+once, a dispatcher task (one per QoS level) publishes them. When a queue is full
+(broker slow or down), the overflow policy decides:
+
+- `drop_oldest`: drop the oldest queued message (default, freshest data wins);
+- `drop_newest`: drop the new message;
+- `block`: wait for space, until the deadline of the request (`asyncio_deadline`):
+  backpressure; at the deadline, the message is dropped and `TimeoutError` raised.
+
+Publishes in flight are capped per QoS level (`inflight`): a QoS 2 publish holds
+its slot for two round trips (PUBLISH/PUBREC, PUBREL/PUBCOMP), so slow QoS 2
+traffic does not take the slots of QoS 0/1, nor hold up their dispatcher.
+A dispatcher takes messages out of its queue only when a slot is free for them:
+the backlog waits in the queue, where `drop_oldest` can drop it.
+
+Coalescing (`coalesce_max_bytes`, disabled by default): small messages queued to
+the same topic (with the same QoS and retain flag) are published as one NDJSON
+payload, one message per line, up to `coalesce_max_bytes`. Only messages already
+queued are coalesced, so it adds no latency: batches grow with the backlog, when
+the broker is the bottleneck. A message that would need a new batch while no slot
+is free stays in the queue. Payloads with a newline are never coalesced.
+
+A coalesced payload is published to its topic + `COALESCED_SUFFIX` (MQTT 3.1.1 has
+no content type), a single message to its topic as is: subscribers split only
+those, by `split_coalesced()`. Do not publish to topics ending with the suffix.
+
+Metrics: queue depth, queue wait and publish latency (per QoS) histograms,
+in flight (per QoS), counters.
+
+**NOTE**: Queued messages are lost if the process dies, and failed publishes
+are not retried: use it for telemetry/notifications, not for must-deliver
+messages.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Literal, Self
+
+from examples.core.asyncio_deadline import budget
+from examples.core.asyncio_queue_metrics import DEPTH_BUCKETS, Histogram
+
+if TYPE_CHECKING:
+    import aiomqtt
+
+LOGGER = logging.getLogger('uvicorn')
+
+OverflowPolicy = Literal['drop_oldest', 'drop_newest', 'block']
+
+# publishes in flight, per QoS
+DEFAULT_INFLIGHT = {0: 64, 1: 16, 2: 8}
+
+# topic suffix of coalesced payloads: NDJSON, one message per line
+COALESCED_SUFFIX = '/_ndjson'
+
+
+def split_coalesced(topic: str, payload: bytes) -> tuple[str, list[bytes]]:
+    """Topic and messages of a received payload, coalesced or not."""
+    if topic.endswith(COALESCED_SUFFIX):
+        # not `splitlines()`: a message may contain `\r`
+        return topic.removesuffix(COALESCED_SUFFIX), payload.split(b'\n')
+    return topic, [payload]
+
+
+@dataclass(slots=True)
+class Message:
+    topic: str
+    payload: str | bytes
+    qos: int = 0
+    retain: bool = False
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+@dataclass(slots=True)
+class _Batch:
+    """Messages to one topic, published as one (NDJSON if more than one)."""
+
+    topic: str
+    qos: int
+    retain: bool
+    payloads: list[str | bytes]
+    size: int  # bytes, of the coalesced payload
+    enqueued_at: float  # of the first message
+
+    @property
+    def publish_topic(self) -> str:
+        if len(self.payloads) == 1:
+            return self.topic
+        return f'{self.topic}{COALESCED_SUFFIX}'
+
+    @property
+    def payload(self) -> str | bytes:
+        if len(self.payloads) == 1:
+            return self.payloads[0]
+        return b'\n'.join(
+            p.encode('utf-8') if isinstance(p, str) else p for p in self.payloads
+        )
+
+
+class _MessageQueue(asyncio.Queue[Message]):
+    """`asyncio.Queue` with `take()`: dequeue some messages, keep the others."""
+
+    def _init(self, maxsize: int) -> None:  # pylint: disable=unused-argument
+        # pylint: disable-next=attribute-defined-outside-init
+        self._queue: deque[Message] = deque()
+
+    def take(self, select: Callable[[Message], bool], window: int) -> None:
+        """Dequeue the messages `select()`ed among the next `window` ones.
+
+        The others stay queued, in order.
+        """
+        kept: list[Message] = []
+        for _ in range(min(window, len(self._queue))):
+            message = self._queue.popleft()
+            if select(message):
+                # a slot is freed, as by `get_nowait()`: wake up a waiting `put()`
+                self._wakeup_next(self._putters)  # type: ignore[attr-defined]
+            else:
+                kept.append(message)
+        self._queue.extendleft(reversed(kept))
+
+
+class MQTTPublisher:  # pylint: disable=too-many-instance-attributes
+    """Publish messages of bounded queues, with in-flight caps per QoS.
+
+    :param `maxsize`: messages, per QoS
+    :param `max_batch`: queued messages scanned for batches at a time
+    """
+
+    def __init__(
+        self,
+        client: aiomqtt.Client,
+        *,
+        maxsize: int = 10_000,
+        overflow: OverflowPolicy = 'drop_oldest',
+        inflight: Mapping[int, int] | None = None,
+        coalesce_max_bytes: int = 0,
+        max_batch: int = 256,
+        drain_timeout: float = 5.0,
+    ) -> None:
+        self._client = client
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.inflight_limits = {**DEFAULT_INFLIGHT, **(inflight or {})}
+        self._queues = {qos: _MessageQueue(maxsize) for qos in self.inflight_limits}
+        self.inflight = dict.fromkeys(self.inflight_limits, 0)
+        self._slot_freed = {qos: asyncio.Event() for qos in self.inflight_limits}
+        self.coalesce_max_bytes = coalesce_max_bytes
+        self.max_batch = max_batch
+        self.drain_timeout = drain_timeout
+        self._dispatchers: list[asyncio.Task[None]] = []
+        self._publishes: set[asyncio.Task[None]] = set()
+        self._closing = False
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.published = 0  # messages
+        self.publishes = 0  # MQTT publishes (batches)
+        self.errors = 0
+        self.depth = {qos: Histogram(DEPTH_BUCKETS) for qos in self.inflight_limits}
+        self.wait = Histogram()
+        self.latency = {qos: Histogram() for qos in self.inflight_limits}
+
+    async def __aenter__(self) -> Self:
+        self._dispatchers = [
+            asyncio.create_task(self._dispatch(qos), name=f'mqtt-publisher-qos{qos}')
+            for qos in self._queues
+        ]
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self._closing = True
+        with contextlib.suppress(TimeoutError):
+            async with asyncio.timeout(self.drain_timeout):
+                for queue in self._queues.values():
+                    await queue.join()
+        tasks = [*self._publishes, *self._dispatchers]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        lost = sum(queue.qsize() for queue in self._queues.values())
+        if lost:
+            LOGGER.warning(f'MQTT publisher: {lost} messages lost')
+
+    async def publish(
+        self, topic: str, payload: str | bytes, *, qos: int = 0, retain: bool = False
+    ) -> bool:
+        """Queue a message, `False` if dropped (the new one).
+
+        Returns at once, unless the queue is full and the policy is `block`:
+        raise `TimeoutError` (dropped) if no space is freed before the deadline.
+        """
+        queue = self._queues.get(qos)
+        if queue is None:
+            raise ValueError(f'invalid QoS: {qos}')
+        if self._closing:
+            self.dropped += 1
+            return False
+        message = Message(topic, payload, qos, retain)
+        if queue.full():
+            if self.overflow == 'drop_newest':
+                self.dropped += 1
+                return False
+            if self.overflow == 'drop_oldest':
+                queue.get_nowait()
+                queue.task_done()
+                self.dropped += 1
+            else:
+                try:
+                    async with asyncio.timeout(budget()):
+                        await queue.put(message)
+                except BaseException:
+                    # deadline reached, or cancelled: not queued
+                    self.dropped += 1
+                    raise
+                self.enqueued += 1
+                return True
+        queue.put_nowait(message)
+        self.enqueued += 1
+        return True
+
+    async def _dispatch(self, qos: int) -> None:
+        queue = self._queues[qos]
+        limit = self.inflight_limits[qos]
+        slot_freed = self._slot_freed[qos]
+        while True:
+            # in-flight cap: wait for a slot before taking a message, so the
+            # backlog waits in the queue
+            while self.inflight[qos] >= limit:
+                slot_freed.clear()
+                await slot_freed.wait()
+            first = await queue.get()
+            batches = self._take(queue, first, limit - self.inflight[qos])
+            self.depth[qos].observe(queue.qsize())
+            for batch in batches:
+                self.inflight[qos] += 1
+                task = asyncio.create_task(self._publish(batch))
+                self._publishes.add(task)
+                task.add_done_callback(self._publishes.discard)
+
+    def _take(self, queue: _MessageQueue, first: Message, slots: int) -> list[_Batch]:
+        """Batches of `first` and of messages queued behind it, at most `slots`.
+
+        Under load, more messages are queued: take them too, without waiting, if
+        they join an open batch of their topic, or a slot is left for a new batch;
+        the others stay queued. Order within a topic is kept: once a message of a
+        topic stays queued, so do the next ones, and a message that can not be
+        coalesced closes the open batch of its topic.
+        """
+        limit = self.coalesce_max_bytes  # 0: a batch per message
+        batches: list[_Batch] = []
+        open_batches: dict[tuple[str, bool], _Batch | None] = {}  # `None`: queued
+
+        def select(m: Message) -> bool:
+            payload = m.payload
+            if isinstance(payload, str):
+                payload = payload.encode('utf-8')
+            key = (m.topic, m.retain)
+            coalescable = b'\n' not in payload
+            if key in open_batches:
+                batch = open_batches[key]
+                if batch is None:
+                    return False
+                if coalescable and batch.size + 1 + len(payload) <= limit:
+                    batch.payloads.append(payload)
+                    batch.size += 1 + len(payload)
+                    return True
+            if len(batches) >= slots:
+                open_batches[key] = None  # needs a new batch, no slot
+                return False
+            batch = _Batch(
+                m.topic, m.qos, m.retain, [payload], len(payload), m.enqueued_at
+            )
+            batches.append(batch)
+            if coalescable and len(payload) < limit:
+                open_batches[key] = batch
+            else:
+                open_batches.pop(key, None)
+            return True
+
+        select(first)
+        queue.take(select, self.max_batch - 1)
+        return batches
+
+    async def _publish(self, batch: _Batch) -> None:
+        started_at = time.perf_counter()
+        self.wait.observe(started_at - batch.enqueued_at)
+        try:
+            await self._client.publish(
+                batch.publish_topic, batch.payload, qos=batch.qos, retain=batch.retain
+            )
+            self.latency[batch.qos].observe(time.perf_counter() - started_at)
+            self.publishes += 1
+            self.published += len(batch.payloads)
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            self.errors += len(batch.payloads)
+            LOGGER.warning(f'MQTT publish to {batch.topic!r} failed: {err!r}')
+        finally:
+            self.inflight[batch.qos] -= 1
+            self._slot_freed[batch.qos].set()
+            queue = self._queues[batch.qos]
+            for _ in batch.payloads:
+                queue.task_done()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            'depth': {qos: queue.qsize() for qos, queue in self._queues.items()},
+            'maxsize': self.maxsize,
+            'inflight': self.inflight,
+            'inflight_limits': self.inflight_limits,
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+            'published': self.published,
+            'publishes': self.publishes,
+            'coalesced': self.published - self.publishes,
+            'errors': self.errors,
+            'depth_samples': {
+                qos: h.snapshot().as_dict() for qos, h in self.depth.items()
+            },
+            'wait_seconds': self.wait.snapshot().as_dict(),
+            'latency_seconds': {
+                qos: h.snapshot().as_dict() for qos, h in self.latency.items()
+            },
+        }
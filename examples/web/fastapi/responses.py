@@ -0,0 +1,67 @@
+"""Fast-path JSON responses.
+
+For a returned `dict`, FastAPI converts it by `jsonable_encoder()` (a recursive
+pure Python walk), then `JSONResponse` renders it by `json.dumps()`.
+For a returned model, it is validated against `response_model` first.
+
+- `FastJSONResponse` renders by `orjson` if installed, otherwise by `pydantic-core`
+  (`TypeAdapter(Any).dump_json()`), without `jsonable_encoder()` when returned
+  directly by the endpoint;
+- `PrecomputedJSON`: the body of a constant response is rendered once (at import),
+  each request only copies the bytes into a new `Response`.
+
+Both handle `datetime`, `UUID`, `Decimal`, etc. like `jsonable_encoder()` does,
+and render compact JSON (no whitespace).
+
+Without `orjson`, falls back to `pydantic-core`.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment, unused-ignore]
+
+# render by `orjson` (if installed), or by `pydantic-core`
+USE_ORJSON = orjson is not None
+
+_ANY: TypeAdapter[Any] = TypeAdapter(Any)
+
+
+def _default(obj: Any) -> Any:
+    # types unknown to `orjson`, e.g. `Decimal`, Pydantic models
+    return _ANY.dump_python(obj, mode='json')
+
+
+def dumps(content: Any) -> bytes:
+    """Render `content` as JSON bytes, by `orjson` if `USE_ORJSON`."""
+    if USE_ORJSON:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return _ANY.dump_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """`JSONResponse` rendered by `dumps()`."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class PrecomputedJSON:
+    """JSON body of a constant response, rendered once."""
+
+    __slots__ = ('body', 'status_code')
+
+    def __init__(self, content: Any, status_code: int = 200) -> None:
+        self.body = dumps(content)
+        self.status_code = status_code
+
+    def response(self) -> Response:
+        # a new `Response` for each request: its headers are mutable
+        return Response(self.body, self.status_code, media_type='application/json')
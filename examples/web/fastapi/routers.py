@@ -3,8 +3,11 @@
 from datetime import datetime
 
 from fastapi import APIRouter
+from fastapi.responses import Response
 from pydantic import BaseModel
 
+from examples.web.fastapi.responses import PrecomputedJSON
+
 router = APIRouter()
 
 
@@ -14,13 +17,17 @@ class BasicResponse(BaseModel):
     item_id: str | None = None
 
 
+# constant: rendered once, not validated and serialised on each request
+HELLO = PrecomputedJSON(BasicResponse().model_dump(mode='json'))
+
+
 @router.get(
     '/hello/',
-    response_model=BasicResponse,
+    response_model=BasicResponse,  # schema of the docs
     summary='API Summary',
 )
-async def hello() -> BasicResponse:
-    return BasicResponse()
+async def hello() -> Response:
+    return HELLO.response()
 
 
 class User(BaseModel):
@@ -1,6 +1,7 @@
 """Settings."""
 
 from functools import lru_cache
+from typing import Literal
 
 from pydantic import MongoDsn, RedisDsn
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -16,6 +17,7 @@ class Settings(BaseSettings):
     app_doc_url: str = '/docs'
     app_description: str = ''
     debug: bool = False
+    request_timeout: float = 5.0  # seconds, deadline of each request
 
     # MongoDB
     mongodb_url: MongoDsn
@@ -27,6 +29,12 @@ class Settings(BaseSettings):
     cache_conn_timeout: float | None = 3.0
     cache_timeout: float | None = 3.5
     cache_prefix: str
+    cache_ttl: float = 60.0  # seconds, L2 (Redis)
+    cache_negative_ttl: float = 10.0  # seconds, of "not found"
+    cache_ttl_jitter: float = 0.1  # TTL * (1 ± jitter)
+    cache_early_refresh_beta: float = 1.0  # 0: disabled
+    cache_l1_maxsize: int = 10000  # in-process, per worker
+    cache_l1_ttl: float = 5.0
 
     # MQTT
     mqtt_host: str = 'localhost'
@@ -36,6 +44,26 @@ class Settings(BaseSettings):
     mqtt_timeout: float | None = 3.5
     mqtt_qos: int = 2
     mqtt_topic_prefix: str
+    mqtt_publish_queue_size: int = 10000  # background publisher, per QoS
+    mqtt_publish_overflow: Literal['drop_oldest', 'drop_newest', 'block'] = (
+        'drop_oldest'
+    )
+    # publishes in flight, per QoS
+    mqtt_publish_inflight_qos0: int = 64
+    mqtt_publish_inflight_qos1: int = 16
+    mqtt_publish_inflight_qos2: int = 8
+    mqtt_publish_coalesce_bytes: int = 0  # NDJSON batches per topic, 0: disabled
+    mqtt_consume_shards: int = 8  # workers, in order within a topic
+    mqtt_consume_queue_size: int = 100  # per shard
+    mqtt_max_queued_incoming: int = 10000  # in the client, discarded over it
+
+    # Hedged requests (reads): backup attempt after p95 latency
+    hedge_max_attempts: int = 2
+
+    # Event loop monitor
+    loop_monitor_interval: float = 0.1
+    loop_monitor_threshold: float = 0.1
+    loop_monitor_profile: bool = False  # `asyncio` loop only, not `uvloop`
 
 
 @lru_cache()
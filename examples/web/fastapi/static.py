@@ -0,0 +1,246 @@
+"""Precompressed static files, with strong ETags and long-lived caching.
+
+`StaticFiles` reads each file from disk and sends it uncompressed on every request.
+For the large bundles of the docs (Swagger UI, ReDoc: 3 MB), instead:
+
+- files are read and compressed once (`load()`, at startup): `gzip`, and `brotli`
+  if installed; each request only picks the bytes;
+- `Accept-Encoding` is negotiated: the coding of the highest `q`, ties broken by
+  preference (`br`, `gzip`, identity), `406 Not Acceptable` if none is acceptable
+  (e.g. `identity;q=0` for a file not compressed); with `Vary: Accept-Encoding`;
+- strong `ETag` per representation (SHA-256 of the content, plus the coding), and
+  `304 Not Modified` for a matching `If-None-Match`;
+- `Cache-Control`: `immutable` for a year with the current version in the URL
+  (`?v=`, see `version()`), otherwise `no-cache` (revalidated by `ETag`).
+
+In-memory content (e.g. rendered HTML) can be served the same way by `add()`.
+
+Without `brotli`, falls back to `gzip` only.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import os
+from collections.abc import Collection, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from fastapi.responses import Response
+from starlette.types import Receive, Scope, Send
+
+try:
+    import brotli  # type: ignore[import-untyped, unused-ignore]
+except ImportError:
+    brotli = None  # type: ignore[assignment, unused-ignore]
+
+# preferred first
+ENCODINGS = ('br', 'gzip')
+
+# of identity, when not in `Accept-Encoding`: acceptable, preferred last
+IDENTITY_Q = 0.001
+
+ONE_YEAR = 365 * 24 * 3600
+
+
+@dataclass(slots=True)
+class _Asset:
+    media_type: str
+    digest: str  # SHA-256 of the content (identity)
+    bodies: dict[str, bytes] = field(default_factory=dict)  # coding -> body
+    cache_control: str | None = None  # fixed, e.g. of HTML
+
+    @property
+    def version(self) -> str:
+        return self.digest[:12]
+
+
+def accepted_encodings(accept_encoding: str) -> dict[str, float]:
+    """`Accept-Encoding` -> {coding: q}, e.g. `gzip;q=0.5, br` -> {gzip: 0.5, br: 1}"""
+    encodings: dict[str, float] = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        name, _, value = params.partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                q = float(value)
+            except ValueError:
+                q = 0.0
+        encodings[coding] = q
+    return encodings
+
+
+def negotiate(accept_encoding: str | None, available: Collection[str]) -> str | None:
+    """Coding of `available` for `Accept-Encoding`, `None` if none is acceptable.
+
+    Highest `q` wins, ties are broken by the order of `ENCODINGS`, then identity.
+    Without the header, identity.
+    """
+    if accept_encoding is None:
+        return 'identity' if 'identity' in available else None
+    accepted = accepted_encodings(accept_encoding)
+    default_q = accepted.get('*')
+    best, best_q = None, 0.0
+    for coding in (*ENCODINGS, 'identity'):
+        if coding not in available:
+            continue
+        q = accepted.get(coding, default_q)
+        if q is None:
+            q = IDENTITY_Q if coding == 'identity' else 0.0
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class PrecompressedStaticFiles:
+    """ASGI app serving files of `directory` from memory, precompressed.
+
+    :param `max_age`: seconds, of versioned URLs (`?v=`)
+    :param `min_size`: bytes, smaller files are not compressed
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str] | None = None,
+        *,
+        max_age: int = ONE_YEAR,
+        gzip_level: int = 9,
+        brotli_quality: int = 9,  # 11: ~10% smaller, ~30x slower
+        min_size: int = 1024,
+    ) -> None:
+        self.directory = Path(directory) if directory is not None else None
+        self.max_age = max_age
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.min_size = min_size
+        self._assets: dict[str, _Asset] = {}
+        self._loaded = False
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._assets
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self) -> None:
+        """Read and compress all files of `directory`, CPU-bound: run in a thread."""
+        if self.directory is not None:
+            for path in sorted(self.directory.rglob('*')):
+                if path.is_file():
+                    name = path.relative_to(self.directory).as_posix()
+                    self.add(name, path.read_bytes())
+        self._loaded = True
+
+    def add(
+        self,
+        name: str,
+        content: bytes,
+        media_type: str | None = None,
+        *,
+        cache_control: str | None = None,
+    ) -> None:
+        if media_type is None:
+            media_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        asset = _Asset(
+            media_type,
+            hashlib.sha256(content).hexdigest(),
+            cache_control=cache_control,
+        )
+        asset.bodies['identity'] = content
+        if len(content) >= self.min_size:
+            compressed = {'gzip': gzip.compress(content, self.gzip_level, mtime=0)}
+            if brotli is not None:
+                compressed['br'] = brotli.compress(content, quality=self.brotli_quality)
+            for coding, body in compressed.items():
+                if len(body) < len(content):
+                    asset.bodies[coding] = body
+        self._assets[name] = asset
+
+    def version(self, name: str) -> str:
+        """For cache busting: `f'{url}?v={version}'`."""
+        return self._assets[name].version
+
+    def response(
+        self,
+        name: str,
+        headers: Mapping[str, str],
+        *,
+        method: str = 'GET',
+        version: str | None = None,
+    ) -> Response:
+        """Response of asset `name` for request `headers` (`404` if unknown)."""
+        asset = self._assets.get(name)
+        if asset is None:
+            return Response('Not Found', 404, media_type='text/plain')
+
+        coding = negotiate(headers.get('accept-encoding'), asset.bodies)
+        if coding is None:
+            return Response(
+                'Not Acceptable',
+                406,
+                media_type='text/plain',
+                headers={'vary': 'Accept-Encoding'},
+            )
+        body = asset.bodies[coding]
+
+        etag = f'"{asset.digest}"'
+        if coding != 'identity':
+            etag = f'"{asset.digest}-{coding}"'
+        if asset.cache_control is not None:
+            cache_control = asset.cache_control
+        elif version == asset.version:
+            cache_control = f'public, max-age={self.max_age}, immutable'
+        else:
+            cache_control = 'no-cache'
+        response_headers = {'etag': etag, 'cache-control': cache_control}
+        if len(asset.bodies) > 1:
+            response_headers['vary'] = 'Accept-Encoding'
+
+        if_none_match = headers.get('if-none-match')
+        if if_none_match is not None and (
+            if_none_match.strip() == '*'
+            or etag in (t.strip().removeprefix('W/') for t in if_none_match.split(','))
+        ):
+            return Response(status_code=304, headers=response_headers)
+
+        if coding != 'identity':
+            response_headers['content-encoding'] = coding
+        if method == 'HEAD':
+            response_headers['content-length'] = str(len(body))
+            body = b''
+        return Response(body, media_type=asset.media_type, headers=response_headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        assert scope['type'] == 'http'
+        if not self._loaded:
+            self.load()  # not loaded at startup: blocks the event loop once
+
+        if scope['method'] not in ('GET', 'HEAD'):
+            response = Response(
+                'Method Not Allowed', 405, headers={'allow': 'GET, HEAD'}
+            )
+        else:
+            # path relative to the mount point
+            path: str = scope['path']
+            root_path: str = scope.get('root_path', '')
+            if root_path and path.startswith(f'{root_path}/'):
+                path = path[len(root_path) :]
+            query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+            headers = {
+                k.decode('latin-1'): v.decode('latin-1') for k, v in scope['headers']
+            }
+            response = self.response(
+                path.lstrip('/'),
+                headers,
+                method=scope['method'],
+                version=query.get('v', [None])[0],
+            )
+        await response(scope, receive, send)